@@ -0,0 +1,170 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, comments_count INTEGER)',
+    'CREATE TABLE comment ('
+    'id INTEGER PRIMARY KEY, post_id INTEGER, text TEXT, created REAL)',
+    'CREATE INDEX comment_post_idx ON comment (post_id, created)',
+)
+POSTS = 100
+# Таймаут sqlite3 по умолчанию, как у Django без OPTIONS.
+DEFAULT_TIMEOUT = 5.0
+
+
+class Mode:
+    """
+    Как приложение работает с базой: новое соединение на каждый
+    запрос с журналом отката по умолчанию или постоянное соединение
+    с SQLITE_PRAGMAS.
+    """
+
+    def __init__(self, name, pragmas, persistent):
+        self.name = name
+        self.pragmas = pragmas
+        self.persistent = persistent
+
+    def connect(self, path):
+        connection = sqlite3.connect(
+            path, timeout=DEFAULT_TIMEOUT, isolation_level=None,
+            check_same_thread=False,
+        )
+        apply_pragmas(connection.cursor(), self.pragmas)
+        return connection
+
+
+class Worker(threading.Thread):
+    def __init__(self, mode, path, operations, operation):
+        super().__init__()
+        self.mode = mode
+        self.path = path
+        self.operations = operations
+        self.operation = operation
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        connection = self.mode.persistent and self.mode.connect(self.path)
+        for number in range(self.operations):
+            started = time.perf_counter()
+            current = connection or self.mode.connect(self.path)
+            try:
+                self.operation(current, number)
+            except sqlite3.OperationalError:
+                self.errors += 1
+                if current.in_transaction:
+                    current.execute('ROLLBACK')
+            else:
+                self.latencies.append(time.perf_counter() - started)
+            finally:
+                if not connection:
+                    current.close()
+        if connection:
+            connection.close()
+
+
+def add_comment(connection, number):
+    """Как add_comment: комментарий и счетчик поста в одной транзакции."""
+    post_id = number % POSTS + 1
+    connection.execute('BEGIN')
+    connection.execute(
+        'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)',
+        (post_id, 'x' * 200, time.time()),
+    )
+    connection.execute(
+        'UPDATE post SET comments_count = comments_count + 1 WHERE id = ?',
+        (post_id,),
+    )
+    connection.execute('COMMIT')
+
+
+def read_comments(connection, number):
+    """Как post_detail: страница комментариев поста."""
+    connection.execute(
+        'SELECT id, text FROM comment WHERE post_id = ? '
+        'ORDER BY created LIMIT 20',
+        (number % POSTS + 1,),
+    ).fetchall()
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест конкурентной записи в SQLite: сравнивает '
+        'журнал отката с соединением на запрос и SQLITE_PRAGMAS '
+        'с постоянным соединением. Пишет во временный файл.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument(
+            '--operations', type=int, default=200,
+            help='Операций на поток',
+        )
+        parser.add_argument(
+            '--dir', default=None,
+            help='Где создать файл базы (важен диск, как у продакшена)',
+        )
+
+    def handle(self, *args, **options):
+        modes = (
+            Mode('journal', {'journal_mode': 'DELETE'}, persistent=False),
+            Mode('tuned', settings.SQLITE_PRAGMAS, persistent=True),
+        )
+        for mode in modes:
+            with tempfile.TemporaryDirectory(dir=options['dir']) as tmp:
+                path = os.path.join(tmp, 'benchmark.sqlite3')
+                self.prepare(mode, path)
+                self.report(mode, self.run(mode, path, options))
+
+    def prepare(self, mode, path):
+        connection = mode.connect(path)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.executemany(
+            'INSERT INTO post (id, comments_count) VALUES (?, 0)',
+            [(pk,) for pk in range(1, POSTS + 1)],
+        )
+        connection.close()
+
+    def run(self, mode, path, options):
+        writers = [
+            Worker(mode, path, options['operations'], add_comment)
+            for _ in range(options['writers'])
+        ]
+        readers = [
+            Worker(mode, path, options['operations'], read_comments)
+            for _ in range(options['readers'])
+        ]
+        started = time.perf_counter()
+        for worker in writers + readers:
+            worker.start()
+        for worker in writers + readers:
+            worker.join()
+        return writers, readers, time.perf_counter() - started
+
+    def report(self, mode, result):
+        writers, readers, elapsed = result
+        for role, workers in (('запись', writers), ('чтение', readers)):
+            latencies = sorted(
+                latency for worker in workers for latency in worker.latencies
+            )
+            errors = sum(worker.errors for worker in workers)
+            if not latencies:
+                self.stdout.write(f'{mode.name:8} {role}: ошибок {errors}')
+                continue
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            self.stdout.write(
+                f'{mode.name:8} {role}: {len(latencies) / elapsed:.0f} оп/с, '
+                f'медиана {statistics.median(latencies) * 1000:.1f} мс, '
+                f'p95 {p95 * 1000:.1f} мс, ошибок «locked» {errors}'
+            )
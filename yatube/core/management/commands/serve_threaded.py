@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import get_internal_wsgi_application
+
+from core.servers import SERVER_THREADS, make_server
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживает WSGI_APPLICATION пулом из --threads потоков в одном '
+        'процессе (см. core.servers).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'addrport', nargs='?', default='127.0.0.1:8000',
+            help='Адрес и порт, по умолчанию 127.0.0.1:8000',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=SERVER_THREADS,
+            help='Сколько запросов обслуживается одновременно',
+        )
+
+    def handle(self, *args, **options):
+        host, _, port = options['addrport'].rpartition(':')
+        if not port.isdigit() or options['threads'] < 1:
+            raise CommandError('Ожидается адрес:порт и --threads не меньше 1')
+        server = make_server(
+            host or '127.0.0.1', int(port),
+            get_internal_wsgi_application(), threads=options['threads'],
+        )
+        self.stdout.write(
+            f'http://{options["addrport"]}/, потоков: {options["threads"]}'
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,116 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.tasks import (execute, execute_in_worker, finish, get_broker,
+                        init_worker)
+
+WORKER_PROCESSES: int = 2
+# Выполненные задачи хранятся сутки: по ним считаются задержки.
+KEEP_DONE = timedelta(days=1)
+PURGE_INTERVAL: int = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди core.tasks в пуле процессов '
+        'с повторами и экспоненциальной задержкой после ошибок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=WORKER_PROCESSES,
+            help='Размер пула; 0 — выполнять в этом процессе',
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза в секундах, когда готовых задач нет',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Завершиться, когда готовых задач не останется',
+        )
+        parser.add_argument(
+            '--max-tasks', type=int, default=0,
+            help='Завершиться после стольких задач (0 — без ограничения)',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.broker = get_broker()
+        self.claimed = 0
+        self.purged_at = 0.0
+        if not options['processes']:
+            self.run_inline()
+        else:
+            with ProcessPoolExecutor(max_workers=options['processes'],
+                                     initializer=init_worker) as pool:
+                self.run_pool(pool)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано задач: {self.claimed}'
+        ))
+
+    def claim(self, limit):
+        if self.options['max_tasks']:
+            limit = min(limit, self.options['max_tasks'] - self.claimed)
+        if limit <= 0:
+            return []
+        tasks = self.broker.claim(limit)
+        self.claimed += len(tasks)
+        return tasks
+
+    def exhausted(self):
+        return (self.options['max_tasks']
+                and self.claimed >= self.options['max_tasks'])
+
+    def run_inline(self):
+        while not self.exhausted():
+            tasks = self.claim(1)
+            if not tasks:
+                if self.options['burst']:
+                    return
+                self.idle()
+                continue
+            for task in tasks:
+                args, kwargs = task.arguments
+                self.finish(task, execute(task.name, args, kwargs))
+
+    def run_pool(self, pool):
+        running = {}
+        while True:
+            for task in self.claim(self.options['processes'] - len(running)):
+                args, kwargs = task.arguments
+                future = pool.submit(
+                    execute_in_worker, task.name, args, kwargs
+                )
+                running[future] = task
+            if not running:
+                if self.options['burst'] or self.exhausted():
+                    return
+                self.idle()
+                continue
+            done, _ = wait(
+                running, timeout=self.options['poll'],
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                self.finish(running.pop(future), future.result())
+
+    def finish(self, task, error):
+        finish(task, error, self.broker)
+        if error is not None:
+            self.stderr.write(
+                f'{task.name} (попытка {task.attempts}): '
+                f'{error.strip().splitlines()[-1]}'
+            )
+        elif self.options['verbosity'] > 1:
+            self.stdout.write(task.name)
+
+    def idle(self):
+        if time.monotonic() - self.purged_at > PURGE_INTERVAL:
+            self.broker.purge(timezone.now() - KEEP_DONE)
+            self.purged_at = time.monotonic()
+        time.sleep(self.options['poll'])
@@ -0,0 +1,169 @@
+"""
+Метрики запросов: число и время SQL, время шаблонов, общее время.
+
+MetricsMiddleware считает их для каждого запроса и копит последние
+SAMPLES_PER_VIEW замеров на view, откуда их берет отчет с процентилями
+(страница /metrics/ для staff). Замеры хранятся в памяти процесса:
+у каждого воркера свой отчет. Бюджеты SQL-запросов на view задаются
+в settings.QUERY_BUDGETS: отчет показывает, сколько замеров вышло
+за бюджет, а тесты проверяют его через core.testing.QueryBudgetMixin.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import (DjangoTemplates, Template,
+                                             reraise)
+from django.template.exceptions import TemplateDoesNotExist
+
+SAMPLES_PER_VIEW: int = 1000
+PERCENTILES = (50, 95, 99)
+FIELDS = ('queries', 'sql_ms', 'template_ms', 'total_ms')
+
+_state = threading.local()
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=SAMPLES_PER_VIEW))
+
+
+class RequestMetrics:
+    """Замер одного запроса; заодно execute_wrapper для соединений."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - started
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'sql_ms': self.sql_time * 1000,
+            'template_ms': self.template_time * 1000,
+            'total_ms': self.total_time * 1000,
+        }
+
+
+def current():
+    return getattr(_state, 'metrics', None)
+
+
+@contextmanager
+def template_timer():
+    """Время шаблонов; вложенный рендер не считается дважды."""
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    metrics.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.template_depth -= 1
+        if not metrics.template_depth:
+            metrics.template_time += time.perf_counter() - started
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with template_timer():
+            return super().render(context, request)
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """Шаблоны Django, которые отчитываются о времени рендера."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу; values отсортированы."""
+    index = max(int(len(values) * percent / 100 + 0.5) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def record(view_name, metrics):
+    with _lock:
+        _samples[view_name].append(metrics.as_dict())
+
+
+def report():
+    """Процентили каждой метрики по последним замерам каждой view."""
+    with _lock:
+        samples = {name: list(rows) for name, rows in _samples.items()}
+    result = {}
+    for name, rows in sorted(samples.items()):
+        budget = query_budget(name)
+        result[name] = {
+            'count': len(rows),
+            'query_budget': budget,
+            'over_budget': 0 if budget is None else sum(
+                row['queries'] > budget for row in rows
+            ),
+        }
+        for field in FIELDS:
+            values = sorted(row[field] for row in rows)
+            result[name][field] = {
+                f'p{percent}': round(percentile(values, percent), 2)
+                for percent in PERCENTILES
+            }
+    return result
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+
+def query_budget(view_name):
+    return settings.QUERY_BUDGETS.get(view_name)
+
+
+class MetricsMiddleware:
+    """
+    Стоит первой в MIDDLEWARE, чтобы общее время и запросы включали
+    сессии, аутентификацию и все остальное. Замер доступен тестам
+    как response.metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        previous = current()
+        _state.metrics = metrics
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _state.metrics = previous
+        metrics.total_time = time.perf_counter() - started
+        response.metrics = metrics
+        if request.resolver_match is not None:
+            record(request.resolver_match.view_name, metrics)
+        return response
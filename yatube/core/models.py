@@ -0,0 +1,55 @@
+import json
+
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Отложенный вызов для воркера (см. core.tasks.DatabaseBroker)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(max_length=200, verbose_name='Задача')
+    payload = models.TextField(default='{}',
+                               verbose_name='Аргументы (JSON)')
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=QUEUED, verbose_name='Статус')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попыток')
+    max_retries = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Повторов после ошибки'
+    )
+    created = models.DateTimeField(default=timezone.now,
+                                   verbose_name='Поставлена')
+    run_at = models.DateTimeField(default=timezone.now,
+                                  verbose_name='Выполнить не раньше')
+    started = models.DateTimeField(null=True, blank=True,
+                                   verbose_name='Начата')
+    finished = models.DateTimeField(null=True, blank=True,
+                                    verbose_name='Завершена')
+    last_error = models.TextField(blank=True,
+                                  verbose_name='Последняя ошибка')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('status', 'run_at'),
+                         name='task_status_run_at_idx'),
+            models.Index(fields=('status', 'finished'),
+                         name='task_status_finished_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} [{self.status}]'
+
+    @property
+    def arguments(self):
+        data = json.loads(self.payload)
+        return data.get('args', []), data.get('kwargs', {})
@@ -0,0 +1,120 @@
+"""
+Чтение лент с реплик базы.
+
+Реплики перечислены в DATABASE_REPLICAS. С них читают только view,
+обернутые в replica_reads; все остальное (запись, админка, команды,
+сессии) работает с основной базой. Запрос, в котором была запись,
+закрепляет браузер за основной базой на DATABASE_PIN_SECONDS
+(см. ReplicaPinMiddleware): автор сразу видит свой пост, даже если
+реплика еще отстает. На столько же отставание реплики ограничено
+и для кеша лент (см. posts.caching.trust_replicas).
+"""
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Приложения, которые всегда читаются с основной базы.
+PRIMARY_APPS = ('sessions',)
+
+_state = threading.local()
+
+
+def pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def pin(value=True):
+    """Закрепляет текущий поток за основной базой; вернет прежнее."""
+    previous = pinned()
+    _state.pinned = value
+    return previous
+
+
+def reading_replicas():
+    """Читает ли сейчас view с реплики."""
+    return (bool(settings.DATABASE_REPLICAS) and not pinned()
+            and getattr(_state, 'replica', False))
+
+
+def replica_reads(view):
+    """
+    Разрешает view (и ее валидаторам) читать с реплики. Закрепление,
+    сделанное внутри view (pin), действует до ее конца.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        previous = getattr(_state, 'replica', False)
+        previous_pin = pinned()
+        _state.replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = previous
+            pin(previous_pin)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if replicas and pinned():
+            # Явно: иначе связанные объекты прочитанной с реплики
+            # модели читались бы с ее базы.
+            return DEFAULT_DB_ALIAS
+        if (not replicas
+                or not getattr(_state, 'replica', False)
+                or model._meta.app_label in PRIMARY_APPS):
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # После записи чтения в этом же запросе идут в основную базу.
+        if model._meta.app_label not in PRIMARY_APPS:
+            _state.wrote = True
+            pin()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # В репликах те же данные, что и в основной базе.
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема приходит на реплики вместе с репликацией.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """
+    Читает и ставит cookie закрепления за основной базой: она живет
+    DATABASE_PIN_SECONDS после последней записи этого браузера.
+    """
+    cookie_name = 'db_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        previous = pin(self.cookie_name in request.COOKIES)
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            pin(previous)
+            _state.wrote = False
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=settings.DATABASE_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,54 @@
+"""
+WSGI-сервер с ограниченным пулом потоков.
+
+Django 2.2 не умеет ASGI и асинхронные view, поэтому медленный запрос
+ленты занимает поток до конца. Вместо процесса на каждый
+одновременный запрос сервер держит в одном процессе threads потоков:
+память общая, соединения с базой живут в потоках между запросами
+(CONN_MAX_AGE). Когда все потоки заняты, сервер не принимает новые
+соединения, и они ждут в очереди сокета, а не в памяти процесса.
+Сравнить с последовательной обработкой: benchmark_views --concurrency.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+
+SERVER_THREADS: int = 8
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGIServer из runserver, запросы которого обслуживает пул потоков."""
+
+    def __init__(self, *args, threads=SERVER_THREADS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slots = threading.BoundedSemaphore(threads)
+        self.pool = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='wsgi'
+        )
+
+    def process_request(self, request, client_address):
+        # Свободного потока нет: следующий accept подождет.
+        self.slots.acquire()
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def make_server(host, port, app, threads=SERVER_THREADS):
+    server = PooledWSGIServer(
+        (host, port), WSGIRequestHandler, threads=threads
+    )
+    server.set_app(app)
+    return server
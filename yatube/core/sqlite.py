@@ -0,0 +1,27 @@
+"""
+Настройка соединений SQLite.
+
+Каждое новое соединение получает PRAGMA из settings.SQLITE_PRAGMAS:
+WAL пускает читателей параллельно с писателем, busy_timeout заставляет
+писателя ждать блокировку вместо ошибки «database is locked».
+Вместе с CONN_MAX_AGE настройка выполняется раз на соединение,
+а не на каждый запрос.
+"""
+from django.conf import settings
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def apply_pragmas(cursor, pragmas):
+    for statement in pragma_statements(pragmas):
+        cursor.execute(statement)
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
@@ -0,0 +1,251 @@
+"""
+Очередь фоновых задач без внешних сервисов.
+
+Функция с декоратором @task вызывается как обычно, а .delay() ставит
+ее вызов в очередь. Брокер подключается через settings.TASK_BROKER;
+DatabaseBroker хранит задачи в таблице core.Task, поэтому задача,
+поставленная внутри транзакции, станет видна воркеру только вместе
+с самой записью. Выполняет задачи команда task_worker: пул процессов,
+повторы с экспоненциальной задержкой и возврат «зависших» задач упавшего
+воркера. С TASKS_ALWAYS_EAGER задача выполняется сразу в вызывающем
+процессе — так работают тесты и локальная разработка без воркера.
+"""
+import functools
+import json
+import traceback
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .metrics import PERCENTILES, percentile
+from .models import Task
+
+# Сколько последних выполненных задач берет отчет о задержках.
+STATS_SAMPLES: int = 1000
+
+_broker = None
+
+
+class BaseBroker:
+    """Интерфейс брокера: очередь, выдача воркеру и итог выполнения."""
+
+    def enqueue(self, name, args, kwargs, run_at, max_retries):
+        raise NotImplementedError
+
+    def claim(self, limit):
+        """Забирает до limit готовых к запуску задач."""
+        raise NotImplementedError
+
+    def ack(self, task):
+        raise NotImplementedError
+
+    def retry(self, task, error, run_at):
+        raise NotImplementedError
+
+    def fail(self, task, error):
+        raise NotImplementedError
+
+    def purge(self, before):
+        """Удаляет выполненные задачи, завершенные раньше before."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Глубина очереди и задержки выполнения."""
+        raise NotImplementedError
+
+
+class DatabaseBroker(BaseBroker):
+    """Брокер поверх таблицы core.Task."""
+
+    def enqueue(self, name, args, kwargs, run_at, max_retries):
+        return Task.objects.create(
+            name=name,
+            payload=json.dumps({'args': list(args), 'kwargs': kwargs}),
+            run_at=run_at,
+            max_retries=max_retries,
+        )
+
+    def _ready(self, now):
+        # Задача упавшего воркера возвращается в очередь по таймауту.
+        stale = now - timedelta(seconds=settings.TASK_VISIBILITY_TIMEOUT)
+        return (Q(status=Task.QUEUED, run_at__lte=now)
+                | Q(status=Task.RUNNING, started__lt=stale))
+
+    def claim(self, limit):
+        now = timezone.now()
+        candidates = list(
+            Task.objects.filter(self._ready(now))
+            .order_by('run_at', 'pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+        claimed = []
+        for pk in candidates:
+            # Условный UPDATE: задачу получит только один из воркеров.
+            if Task.objects.filter(self._ready(now), pk=pk).update(
+                status=Task.RUNNING, started=now,
+                attempts=F('attempts') + 1,
+            ):
+                claimed.append(pk)
+        return list(Task.objects.filter(pk__in=claimed).order_by('run_at'))
+
+    def ack(self, task):
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.DONE, finished=timezone.now(), last_error=''
+        )
+
+    def retry(self, task, error, run_at):
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.QUEUED, run_at=run_at, last_error=error
+        )
+
+    def fail(self, task, error):
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.FAILED, finished=timezone.now(), last_error=error
+        )
+
+    def purge(self, before):
+        return Task.objects.filter(
+            status=Task.DONE, finished__lt=before
+        ).delete()[0]
+
+    def stats(self):
+        now = timezone.now()
+        counts = dict(
+            Task.objects.order_by().values('status')
+            .annotate(total=Count('pk')).values_list('status', 'total')
+        )
+        oldest = (
+            Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+            .order_by('run_at').values_list('run_at', flat=True).first()
+        )
+        done = list(
+            Task.objects.filter(status=Task.DONE)
+            .order_by('-finished')
+            .values_list('run_at', 'started', 'finished')[:STATS_SAMPLES]
+        )
+        return {
+            'queued': counts.get(Task.QUEUED, 0),
+            'running': counts.get(Task.RUNNING, 0),
+            'failed': counts.get(Task.FAILED, 0),
+            'oldest_due_seconds': (
+                round((now - oldest).total_seconds(), 1) if oldest else 0
+            ),
+            'wait_ms': _percentiles(
+                started - run_at for run_at, started, _ in done
+            ),
+            'run_ms': _percentiles(
+                finished - started for _, started, finished in done
+            ),
+        }
+
+
+def _percentiles(durations):
+    values = sorted(
+        max(duration.total_seconds(), 0) * 1000 for duration in durations
+    )
+    if not values:
+        return None
+    return {
+        f'p{percent}': round(percentile(values, percent), 2)
+        for percent in PERCENTILES
+    }
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.TASK_BROKER)()
+    return _broker
+
+
+class BackgroundTask:
+    """Функция, которую можно вызвать сразу или поставить в очередь."""
+
+    def __init__(self, func, max_retries):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_retries = max_retries
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __reduce__(self):
+        # В пул процессов задача передается по имени.
+        return import_string, (self.name,)
+
+    def delay(self, *args, **kwargs):
+        return self.apply_async(args, kwargs)
+
+    def apply_async(self, args=(), kwargs=None, countdown=0):
+        kwargs = kwargs or {}
+        if settings.TASKS_ALWAYS_EAGER:
+            self.func(*args, **kwargs)
+            return None
+        return get_broker().enqueue(
+            self.name, args, kwargs,
+            run_at=timezone.now() + timedelta(seconds=countdown),
+            max_retries=self.max_retries,
+        )
+
+
+def task(func=None, *, max_retries=None):
+    """
+    Декоратор фоновой задачи. Аргументы должны сериализоваться в JSON:
+    передавайте id, а не объекты моделей.
+    """
+    if max_retries is None:
+        max_retries = settings.TASK_MAX_RETRIES
+    if func is None:
+        return functools.partial(task, max_retries=max_retries)
+    return BackgroundTask(func, max_retries)
+
+
+def init_worker():
+    # В дочернем процессе нельзя пользоваться соединениями родителя.
+    django.setup()
+    connections.close_all()
+
+
+def execute(name, args, kwargs):
+    """
+    Выполняет задачу. Возвращает None или текст ошибки: из процесса
+    пула исключение не всегда переживет pickle.
+    """
+    try:
+        import_string(name).func(*args, **kwargs)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def execute_in_worker(name, args, kwargs):
+    """То же в процессе пула: соединения живут как между запросами."""
+    close_old_connections()
+    try:
+        return execute(name, args, kwargs)
+    finally:
+        close_old_connections()
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед повтором."""
+    return settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1)
+
+
+def finish(task, error, broker=None):
+    """Записывает итог выполнения: успех, повтор или ошибка."""
+    broker = broker or get_broker()
+    if error is None:
+        broker.ack(task)
+    elif task.attempts <= task.max_retries:
+        broker.retry(task, error, timezone.now() + timedelta(
+            seconds=retry_delay(task.attempts)
+        ))
+    else:
+        broker.fail(task, error)
@@ -0,0 +1,14 @@
+from .metrics import query_budget
+
+
+class QueryBudgetMixin:
+    """Проверка бюджета SQL-запросов view из settings.QUERY_BUDGETS."""
+
+    def assertWithinQueryBudget(self, response):
+        view_name = response.resolver_match.view_name
+        budget = query_budget(view_name)
+        self.assertIsNotNone(budget, f'Для {view_name} не задан бюджет')
+        self.assertLessEqual(
+            response.metrics.queries, budget,
+            f'{view_name}: SQL-запросов больше бюджета',
+        )
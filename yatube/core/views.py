@@ -1,5 +1,10 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import metrics as request_metrics
+from .tasks import get_broker
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -7,3 +12,23 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def metrics(request):
+    """Процентили метрик по view в этом процессе; ?reset=1 — сбросить."""
+    report = request_metrics.report()
+    if request.GET.get('reset'):
+        request_metrics.reset()
+    return JsonResponse(
+        report, json_dumps_params={'ensure_ascii': False, 'indent': 2}
+    )
+
+
+@staff_member_required
+def task_metrics(request):
+    """Глубина очереди фоновых задач и задержки их выполнения."""
+    return JsonResponse(
+        get_broker().stats(),
+        json_dumps_params={'ensure_ascii': False, 'indent': 2},
+    )
@@ -1,23 +1,48 @@
 from django.contrib import admin
 
-from .models import Group, Post
+from .models import Comment, Group, Post
+from .search import get_backend
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_display = (
+        'pk', 'text', 'pub_date', 'author', 'group', 'comments_count'
+    )
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск через полнотекстовый индекс вместо LIKE '%term%'.
+        if not search_term:
+            return queryset, False
+        return get_backend().filter(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("title",)}
-    list_display = ('pk', 'title', 'description', 'slug')
+    list_display = ('pk', 'title', 'description', 'slug', 'posts_count')
     list_editable = ('title',)
+    readonly_fields = ('posts_count',)
     search_fields = ('description',)
     empty_value_display = '-пусто-'
 
 
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('author', 'post')
+    search_fields = ('text',)
+    empty_value_display = '-пусто-'
+
+    def get_readonly_fields(self, request, obj=None):
+        # Перенос комментария в другой пост сбил бы счетчики обоих постов.
+        if obj is not None:
+            return ('post',)
+        return ()
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
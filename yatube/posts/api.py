@@ -0,0 +1,177 @@
+"""
+JSON API только для чтения: те же ленты, что и HTML-страницы.
+
+Валидаторы (ETag, Last-Modified) считаются до view по поколениям
+кеша лент (у ленты подписок — лент авторов, на которых подписан
+читатель), поэтому неизменившаяся лента отвечает 304 без выборки
+постов и сериализации; в базу идет разве что поиск группы
+или автора по адресу.
+"""
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_safe
+from django.views.decorators.vary import vary_on_cookie
+
+from core.routers import replica_reads
+
+from .caching import INDEX_FEED, author_feed, feeds_state
+from .conditional import (author_feed_of, author_of, feed_condition,
+                          group_feed_of, group_of, post_condition,
+                          request_memo)
+from .feeds import FEED_SORTS, feed_queryset, feed_sort, timeline_queryset
+from .following import followed_authors
+from .models import Post
+from .paginators import CursorPaginator, TimelinePaginator, page_query
+from .timelines import TIMELINE_ORDERING, timeline
+from .views import comments_paginator, num_of_pub
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created,
+    }
+
+
+def page_link(request, query):
+    if not query:
+        return None
+    return request.build_absolute_uri(
+        f'{request.path}?{page_query(request.GET, query)}'
+    )
+
+
+def serialize_page(request, page_obj, serialize=serialize_post):
+    return {
+        'results': [serialize(obj) for obj in page_obj],
+        'next': page_link(request, page_obj.next_query),
+        'previous': page_link(request, page_obj.previous_query),
+    }
+
+
+def feed_page(request, post_list, count=None):
+    """Первая страница ленты и дальше только по курсору."""
+    paginator = CursorPaginator(
+        feed_queryset(post_list),
+        num_of_pub,
+        ordering=FEED_SORTS[feed_sort(request)],
+        shallow_pages=1,
+        count=count,
+    )
+    return paginator.get_page(cursor=request.GET.get('cursor'))
+
+
+def json_response(data):
+    return JsonResponse(data, json_dumps_params=JSON_PARAMS)
+
+
+def api_parts(request, *args, **kwargs):
+    return ('api',)
+
+
+@replica_reads
+@require_safe
+@feed_condition(lambda request: INDEX_FEED, api_parts)
+def index(request):
+    page_obj = feed_page(request, Post.objects.all())
+    return json_response(serialize_page(request, page_obj))
+
+
+@replica_reads
+@require_safe
+@feed_condition(group_feed_of, api_parts)
+def group_posts(request, slug):
+    group = group_of(request, slug)
+    page_obj = feed_page(request, group.posts.all(), group.posts_count)
+    data = serialize_page(request, page_obj)
+    data['group'] = {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+        'posts_count': group.posts_count,
+    }
+    return json_response(data)
+
+
+@replica_reads
+@require_safe
+@feed_condition(author_feed_of, api_parts)
+def profile(request, username):
+    author = author_of(request, username)
+    page_obj = feed_page(request, author.posts.all())
+    data = serialize_page(request, page_obj)
+    data['author'] = {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+    }
+    return json_response(data)
+
+
+@replica_reads
+@require_safe
+@post_condition()
+def post_detail(request, post_id):
+    post = get_object_or_404(feed_queryset(Post.objects), pk=post_id)
+    comments = comments_paginator(request, post)
+    return json_response({
+        'post': serialize_post(post),
+        'comments': serialize_page(request, comments, serialize_comment),
+    })
+
+
+@request_memo
+def _timeline_state(request):
+    # Лента подписок — посты авторов, на которых подписан читатель:
+    # она меняется вместе с набором подписок или поколением ленты
+    # любого из этих авторов (новый пост, правка, комментарий).
+    authors = followed_authors(request.user)
+    key, last_modified = feeds_state(author_feed(pk) for pk in authors.ids)
+    return f'{authors.key}:{key}', last_modified
+
+
+def follow_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    return f'follow:{_timeline_state(request)[0]}'
+
+
+def follow_last_modified(request):
+    if not request.user.is_authenticated:
+        return None
+    return _timeline_state(request)[1]
+
+
+@replica_reads
+@require_safe
+@vary_on_cookie
+@condition(etag_func=follow_etag, last_modified_func=follow_last_modified)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Нужна авторизация'}, status=401,
+            json_dumps_params=JSON_PARAMS,
+        )
+    paginator = TimelinePaginator(
+        timeline_queryset(timeline(request.user)),
+        num_of_pub,
+        ordering=TIMELINE_ORDERING,
+        shallow_pages=1,
+    )
+    page_obj = paginator.get_page(cursor=request.GET.get('cursor'))
+    return json_response(serialize_page(request, page_obj))
@@ -0,0 +1,211 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from zlib import crc32
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from core.routers import pin, reading_replicas
+
+logger = logging.getLogger(__name__)
+
+FEED_CACHE_TIMEOUT: int = 60 * 5
+# Сколько секунд число записей ленты считается свежим. Устаревшее
+# значение отдается как есть, пока фоновый поток его пересчитывает.
+COUNT_FRESH_SECONDS: int = 60 * 10
+COUNT_REFRESH_WORKERS: int = 1
+INDEX_FEED = 'index'
+# Лента «Популярное» сбрасывается после каждого пересчета рейтинга.
+HOT_FEED = 'hot'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def post_feeds(author_id, group_id):
+    """Ленты, в которых показывается пост."""
+    feeds = [INDEX_FEED, author_feed(author_id)]
+    if group_id is not None:
+        feeds.append(group_feed(group_id))
+    return feeds
+
+
+def _generation_key(feed):
+    return f'feed-generation:{feed}'
+
+
+def _modified_key(feed):
+    return f'feed-modified:{feed}'
+
+
+def feed_generation(feed):
+    """Текущее поколение ленты: входит во все ключи ее кеша."""
+    key = _generation_key(feed)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, 1, None)
+        generation = cache.get(key, 1)
+    return generation
+
+
+def bump_feeds(*feeds):
+    """
+    Сдвигает поколение лент: старые страницы и фрагменты
+    перестают находиться по ключу и доживают до истечения таймаута.
+    """
+    feeds = set(feeds)
+    for feed in feeds:
+        key = _generation_key(feed)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+    now = timezone.now()
+    cache.set_many({_modified_key(feed): now for feed in feeds}, None)
+
+
+def feed_last_modified(feed):
+    """
+    Время последнего сброса ленты — ее Last-Modified. Если кеш его
+    потерял, считаем ленту измененной сейчас: лишний 200 лучше
+    ошибочного 304.
+    """
+    key = _modified_key(feed)
+    modified = cache.get(key)
+    if modified is None:
+        cache.add(key, timezone.now(), None)
+        modified = cache.get(key)
+    return modified
+
+
+def trust_replicas(*feeds):
+    """
+    Страницы, фрагменты и ETag нового поколения ленты нельзя собирать
+    с реплики, которая может еще не видеть сдвинувшую его запись:
+    пока поколение моложе DATABASE_PIN_SECONDS, запрос дочитывается
+    с основной базы. Дальше поколение снова собирается с реплик.
+    """
+    if not reading_replicas():
+        return
+    lag = timedelta(seconds=settings.DATABASE_PIN_SECONDS)
+    now = timezone.now()
+    if any(now - feed_last_modified(feed) < lag for feed in feeds):
+        pin()
+
+
+def feed_etag(feed, *parts):
+    """ETag ленты: ее поколение плюс то, от чего еще зависит ответ."""
+    return ':'.join(str(part) for part in (feed_cache_key(feed), *parts))
+
+
+def feed_cache_key(feed):
+    """Ключ для {% cache %}: лента и ее текущее поколение."""
+    return f'{feed}:{feed_generation(feed)}'
+
+
+def feeds_state(feeds):
+    """
+    Ключ и Last-Modified набора лент (лента подписок собирается из
+    лент авторов): ключ меняется со сдвигом поколения любой из них.
+    Поколения читаются из кеша одним запросом, без обращения к базе.
+    """
+    feeds = sorted(feeds)
+    cached = cache.get_many([
+        key for feed in feeds
+        for key in (_generation_key(feed), _modified_key(feed))
+    ])
+    # Потерянные кешем поколение и время заводятся заново.
+    state = ','.join(
+        f'{feed}='
+        f'{cached.get(_generation_key(feed)) or feed_generation(feed)}'
+        for feed in feeds
+    )
+    last_modified = max((
+        cached.get(_modified_key(feed)) or feed_last_modified(feed)
+        for feed in feeds
+    ), default=None)
+    return f'{len(feeds)}:{crc32(state.encode())}', last_modified
+
+
+def cached_feed_page(request, feed, render_page):
+    """
+    Целиком кеширует страницу ленты для анонимных посетителей.
+    Авторизованным страница собирается заново, а список постов
+    берется из фрагментного кеша (см. feed_cache_key).
+    """
+    trust_replicas(feed)
+    if request.method != 'GET' or request.user.is_authenticated:
+        return render_page()
+    key = f'feed-page:{feed_cache_key(feed)}:{request.get_full_path()}'
+    response = cache.get(key)
+    if response is None:
+        response = render_page()
+        if response.status_code == 200 and not response.cookies:
+            cache.set(key, response, FEED_CACHE_TIMEOUT)
+    return response
+
+
+_count_executor = None
+
+
+def _count_key(name):
+    return f'feed-count:{name}'
+
+
+def _store_count(name, compute):
+    count = compute()
+    cache.set(
+        _count_key(name), (count, time.time() + COUNT_FRESH_SECONDS), None
+    )
+    return count
+
+
+def _refresh_count(name, compute):
+    try:
+        _store_count(name, compute)
+    except Exception:
+        logger.exception('Не удалось пересчитать ленту %s', name)
+    finally:
+        cache.delete(f'{_count_key(name)}:refresh')
+        if COUNT_REFRESH_WORKERS:
+            # Соединения потока не переживут его самого.
+            connections.close_all()
+
+
+def _schedule_refresh(name, compute):
+    global _count_executor
+    if not cache.add(f'{_count_key(name)}:refresh', 1, COUNT_FRESH_SECONDS):
+        return
+    if not COUNT_REFRESH_WORKERS:
+        _refresh_count(name, compute)
+        return
+    if _count_executor is None:
+        _count_executor = ThreadPoolExecutor(
+            max_workers=COUNT_REFRESH_WORKERS
+        )
+    _count_executor.submit(_refresh_count, name, compute)
+
+
+def cached_count(name, compute):
+    """
+    Число записей ленты для ссылок пагинатора без COUNT(*) на каждый
+    запрос. Синхронно compute вызывается только при пустом кеше;
+    устаревшее значение пересчитывается в фоне, а запрос получает
+    прошлое — для ссылки «Последняя» его точности хватает.
+    """
+    cached = cache.get(_count_key(name))
+    if cached is None:
+        return _store_count(name, compute)
+    count, fresh_until = cached
+    if fresh_until < time.time():
+        _schedule_refresh(name, compute)
+    return count
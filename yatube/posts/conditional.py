@@ -0,0 +1,181 @@
+"""
+Условные GET-запросы: валидаторы ETag/Last-Modified для лент и постов
+и заголовки HTTP-кеширования для HTML-страниц.
+
+Ленты проверяются по поколениям их кеша (см. caching.bump_feeds),
+посты — по одной строке с датой изменения и счетчиками.
+"""
+from functools import wraps
+from zlib import crc32
+
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .caching import (author_feed, feed_cache_key, feed_etag,
+                      feed_last_modified, group_feed, trust_replicas)
+from .feeds import feed_sort
+from .following import followed_authors
+from .models import Group, Post, User
+
+# Сколько прокси и браузеры могут отдавать анонимную страницу без проверки.
+PUBLIC_MAX_AGE: int = 60
+
+
+def request_memo(func):
+    """Валидаторы condition() спрашивают одно и то же дважды: запоминаем."""
+    @wraps(func)
+    def wrapper(request, *args, **kwargs):
+        memo = request.__dict__.setdefault('_validator_memo', {})
+        if func not in memo:
+            memo[func] = func(request, *args, **kwargs)
+        return memo[func]
+    return wrapper
+
+
+@request_memo
+def group_of(request, slug):
+    """Группа страницы: ее ищут и валидаторы, и сама view."""
+    return get_object_or_404(Group, slug=slug)
+
+
+@request_memo
+def author_of(request, username):
+    return get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+
+
+def group_feed_of(request, slug):
+    return group_feed(group_of(request, slug).pk)
+
+
+def author_feed_of(request, username):
+    return author_feed(author_of(request, username).pk)
+
+
+@request_memo
+def post_state(request, post_id):
+    return Post.objects.filter(pk=post_id).values(
+        'author_id', 'updated', 'last_activity', 'comments_count'
+    ).first()
+
+
+def viewer(request):
+    """Шапка страницы своя у каждого пользователя."""
+    return request.user.pk if request.user.is_authenticated else 'anon'
+
+
+def following(request, username):
+    if not request.user.is_authenticated:
+        return None
+    return author_of(request, username).pk in followed_authors(request.user)
+
+
+def no_parts(request, *args, **kwargs):
+    return ()
+
+
+def feed_condition(get_feed, parts=no_parts, personal=False):
+    """
+    condition() для ленты, которую get_feed находит по аргументам view;
+    если ленты нет, get_feed возвращает None или сразу бросает Http404.
+    parts добавляет в ETag то, от чего еще зависит ответ. У личных
+    (personal) страниц Last-Modified только для анонимов: по дате
+    нельзя отличить страницу одного пользователя от другого.
+    """
+    def etag(request, *args, **kwargs):
+        feed = get_feed(request, *args, **kwargs)
+        if feed:
+            trust_replicas(feed)
+        return feed and feed_etag(
+            feed, feed_sort(request), *parts(request, *args, **kwargs)
+        )
+
+    def last_modified(request, *args, **kwargs):
+        if personal and request.user.is_authenticated:
+            return None
+        feed = get_feed(request, *args, **kwargs)
+        return feed and feed_last_modified(feed)
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def post_etag_parts(state):
+    return (
+        state['updated'].timestamp(),
+        state['last_activity'].timestamp(),
+        state['comments_count'],
+    )
+
+
+def post_condition(parts=no_parts, personal=False):
+    """condition() для страницы поста: правка, комментарии и parts."""
+    def etag(request, post_id):
+        state = post_state(request, post_id)
+        if state is None:
+            return None
+        return ':'.join(str(part) for part in (
+            'post', post_id, *post_etag_parts(state),
+            *parts(request, state),
+        ))
+
+    def last_modified(request, post_id):
+        if personal and request.user.is_authenticated:
+            return None
+        state = post_state(request, post_id)
+        return state and max(state['updated'], state['last_activity'])
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def html_feed_parts(request, *args, **kwargs):
+    # Кнопки подписки у постов зависят от набора подписок читателя.
+    return ('html', followed_authors(request.user).key)
+
+
+def html_profile_parts(request, username):
+    return ('html', viewer(request), following(request, username))
+
+
+def form_token(request):
+    """
+    Версия CSRF-cookie для страниц с формой: после входа токен новый,
+    и страница из кеша браузера со старым токеном форму уже не отправит.
+    get_token заводит cookie сразу, чтобы ETag совпал с ответом.
+    """
+    if not request.user.is_authenticated:
+        return None
+    get_token(request)
+    return crc32(request.META['CSRF_COOKIE'].encode())
+
+
+def html_post_parts(request, state):
+    # На странице поста виден счетчик постов автора, а у вошедших —
+    # форма комментария с CSRF-токеном.
+    feed = author_feed(state['author_id'])
+    trust_replicas(feed)
+    return ('html', viewer(request), feed_cache_key(feed),
+            form_token(request))
+
+
+def http_cache(view):
+    """
+    Cache-Control для HTML-страниц с валидаторами. Анонимные ответы
+    одинаковы для всех и могут храниться в общем прокси; страницы
+    пользователя — только в его браузере и всегда с проверкой (304).
+    Vary: Cookie отделяет одни от других.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(
+                response, public=True, max_age=PUBLIC_MAX_AGE
+            )
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
@@ -0,0 +1,12 @@
+from django.utils.functional import SimpleLazyObject
+
+from .following import followed_authors as load_followed_authors
+
+
+def followed_authors(request):
+    """Подписки читателя для кнопок у постов; читаются, только если нужны."""
+    return {
+        'followed_authors': SimpleLazyObject(
+            lambda: load_followed_authors(request.user)
+        ),
+    }
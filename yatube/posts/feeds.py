@@ -0,0 +1,69 @@
+from django.db.models import Sum
+
+from .caching import INDEX_FEED, cached_count
+from .models import UserStats
+from .paginators import ACTIVITY_ORDERING, FEED_ORDERING
+
+FEED_RELATED = ('author__stats', 'group')
+# Порядок ленты по параметру ?sort=: новые посты или обсуждаемые.
+FEED_SORTS = {
+    '': FEED_ORDERING,
+    'activity': ACTIVITY_ORDERING,
+}
+
+
+def feed_sort(request):
+    sort = request.GET.get('sort', '')
+    return sort if sort in FEED_SORTS else ''
+
+
+def feed_queryset(queryset):
+    """Автор и группа приходят в том же запросе, что и посты."""
+    return queryset.select_related(*FEED_RELATED)
+
+
+def timeline_queryset(entries):
+    """
+    То же для записей со ссылкой на пост (лента подписок, «Популярное»):
+    посты подтягиваются join-ом.
+    """
+    return entries.select_related(*(f'post__{name}' for name in FEED_RELATED))
+
+
+def author_stats(author):
+    """Счетчики автора; у нового пользователя строки еще нет."""
+    try:
+        return author.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=author)
+
+
+def author_posts_count(author):
+    return author_stats(author).posts_count
+
+
+def index_posts_count():
+    """
+    Число постов главной для пагинатора: сумма счетчиков авторов
+    (строк в UserStats на порядки меньше, чем постов), закешированная
+    через cached_count.
+    """
+    return cached_count(INDEX_FEED, lambda: UserStats.objects.aggregate(
+        total=Sum('posts_count')
+    )['total'] or 0)
+
+
+def attach_author_post_counts(posts):
+    """
+    Проставляет post.author_posts_count из счетчика автора,
+    который приходит в том же запросе, что и посты.
+    """
+    posts = list(posts)
+    for post in posts:
+        post.author_posts_count = author_posts_count(post.author)
+    return posts
+
+
+def load_feed_page(page_obj):
+    page_obj.object_list = attach_author_post_counts(page_obj.object_list)
+    return page_obj
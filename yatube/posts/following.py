@@ -0,0 +1,93 @@
+"""
+Подписки читателя в кеше: отсортированный массив id авторов
+(4 байта на автора). Массив загружается одним запросом при первом
+обращении и лежит под версией ключа; сигналы Follow и импорт не правят
+его, а сдвигают версию, так что одновременные подписки не затирают
+друг друга. В запросе массив превращается в frozenset для проверок
+за O(1).
+"""
+import time
+from array import array
+from zlib import crc32
+
+from django.core.cache import cache
+
+from .models import Follow
+
+FOLLOWED_TIMEOUT: int = 60 * 60 * 24
+ID_TYPECODE = 'I'
+
+
+class FollowedAuthors:
+    """
+    Авторы, на которых подписан читатель. key меняется вместе
+    с набором и входит в ключи кеша страниц с кнопками подписки.
+    """
+
+    def __init__(self, user_id=None, raw=b''):
+        ids = array(ID_TYPECODE)
+        ids.frombytes(raw)
+        self.ids = frozenset(ids)
+        self.key = 'anon' if user_id is None else f'{user_id}:{crc32(raw)}'
+
+    def __contains__(self, author_id):
+        return author_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+
+ANONYMOUS = FollowedAuthors()
+
+
+def _version_key(user_id):
+    return f'followed-authors-version:{user_id}'
+
+
+def _version(user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Версия, потерянная кешем, начинается со времени в мс, а не с 1:
+        # массивы под прежними версиями остаются ненайденными.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def _key(user_id, version):
+    return f'followed-authors:{user_id}:{version}'
+
+
+def _load(user_id, key):
+    ids = array(ID_TYPECODE, Follow.objects.filter(user_id=user_id)
+                .order_by('author_id')
+                .values_list('author_id', flat=True))
+    raw = ids.tobytes()
+    # Если подписки поменялись во время чтения, массив ляжет под
+    # прежнюю версию, и его уже никто не прочтет.
+    cache.set(key, raw, FOLLOWED_TIMEOUT)
+    return raw
+
+
+def followed_authors(user):
+    """Подписки пользователя; в пределах запроса читаются один раз."""
+    if not user.is_authenticated:
+        return ANONYMOUS
+    if not hasattr(user, '_followed_authors'):
+        key = _key(user.pk, _version(user.pk))
+        raw = cache.get(key)
+        if raw is None:
+            raw = _load(user.pk, key)
+        user._followed_authors = FollowedAuthors(user.pk, raw)
+    return user._followed_authors
+
+
+def invalidate(*user_ids):
+    """Подписки пользователей изменились: массив загрузится заново."""
+    for user_id in user_ids:
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            # Версии нет в кеше: читатель заведет ее заново.
+            pass
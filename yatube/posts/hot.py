@@ -0,0 +1,121 @@
+import datetime
+import math
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .caching import HOT_FEED, bump_feeds
+from .models import Follow, HotPost, Post
+
+HOT_ORDERING = ('-score', '-post_id')
+# Посты старше окна в рейтинг не попадают.
+HOT_WINDOW = datetime.timedelta(days=3)
+# Подписки, оформленные в течение суток после поста, засчитываются ему.
+FOLLOW_WINDOW = datetime.timedelta(days=1)
+FOLLOW_WEIGHT: int = 5
+# Вдесятеро большая вовлеченность равна посту, вышедшему на 12,5 ч позже.
+HOT_DECAY_SECONDS: int = 45000
+HOT_EPOCH = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+HOT_BATCH_SIZE: int = 1000
+
+
+def hot_score(engagement, pub_date):
+    """
+    Затухание по времени заложено в сам рейтинг через время публикации,
+    а не через возраст поста: рейтинг не меняется, пока не изменится
+    вовлеченность, поэтому пересчитывать нужно только затронутые посты.
+    """
+    order = math.log10(max(engagement, 1))
+    return order + (pub_date - HOT_EPOCH).total_seconds() / HOT_DECAY_SECONDS
+
+
+def last_run():
+    return HotPost.objects.aggregate(last=Max('computed_at'))['last']
+
+
+def touched_post_ids(since, window_start):
+    """
+    Посты окна, у которых с прошлого пересчета появились комментарии
+    (last_activity) или у авторов которых появились подписчики.
+    Без прошлого пересчета — все посты окна.
+    """
+    posts = Post.objects.filter(pub_date__gte=window_start)
+    if since is None:
+        return set(posts.values_list('pk', flat=True))
+    authors = (
+        Follow.objects.filter(created__gt=since)
+        .values_list('author_id', flat=True).distinct()
+    )
+    return set(
+        posts.filter(last_activity__gt=since).values_list('pk', flat=True)
+    ) | set(
+        posts.filter(author_id__in=list(authors))
+        .values_list('pk', flat=True)
+    )
+
+
+def _follow_times(author_ids, window_start):
+    follows = defaultdict(list)
+    rows = (
+        Follow.objects.filter(author_id__in=author_ids,
+                              created__gte=window_start)
+        .order_by('created').values_list('author_id', 'created')
+    )
+    for author_id, created in rows:
+        follows[author_id].append(created)
+    return follows
+
+
+def _follows_gained(times, pub_date):
+    return (bisect_left(times, pub_date + FOLLOW_WINDOW)
+            - bisect_left(times, pub_date))
+
+
+def _store(rows, computed_at):
+    ids = [pk for pk, _ in rows]
+    existing = set(
+        HotPost.objects.filter(pk__in=ids).values_list('pk', flat=True)
+    )
+    hot_posts = [
+        HotPost(post_id=pk, score=score, computed_at=computed_at)
+        for pk, score in rows
+    ]
+    HotPost.objects.bulk_update(
+        [hot for hot in hot_posts if hot.post_id in existing],
+        ['score', 'computed_at'],
+    )
+    HotPost.objects.bulk_create(
+        [hot for hot in hot_posts if hot.post_id not in existing]
+    )
+
+
+def recompute(full=False, batch_size=HOT_BATCH_SIZE, now=None):
+    """
+    Пересчитывает рейтинг постов, затронутых с прошлого запуска,
+    и выкидывает из него вышедшие из окна посты. Возвращает число
+    пересчитанных постов.
+    """
+    now = now or timezone.now()
+    window_start = now - HOT_WINDOW
+    since = None if full else last_run()
+    ids = sorted(touched_post_ids(since, window_start))
+    for start in range(0, len(ids), batch_size):
+        posts = list(
+            Post.objects.filter(pk__in=ids[start:start + batch_size])
+            .values_list('pk', 'author_id', 'pub_date', 'comments_count')
+        )
+        follows = _follow_times({post[1] for post in posts}, window_start)
+        _store([
+            (pk, hot_score(
+                comments + FOLLOW_WEIGHT * _follows_gained(
+                    follows[author_id], pub_date
+                ),
+                pub_date,
+            ))
+            for pk, author_id, pub_date, comments in posts
+        ], now)
+    HotPost.objects.filter(post__pub_date__lt=window_start).delete()
+    bump_feeds(HOT_FEED)
+    return len(ids)
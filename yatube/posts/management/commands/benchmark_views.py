@@ -0,0 +1,261 @@
+import json
+import random
+import statistics
+import subprocess
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.metrics import percentile
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import (AFTER, FEED_ORDERING, SHALLOW_PAGES,
+                              encode_cursor)
+from posts.views import num_of_pub
+
+from .seed_benchmark import READER_PREFIX
+
+# Сколько разных групп, авторов и постов перебирает сценарий.
+TARGETS: int = 50
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summary(latencies, queries, statuses, elapsed):
+    latencies = sorted(latency * 1000 for latency in latencies)
+    queries = sorted(queries)
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'statuses': dict(Counter(statuses)),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies), 2),
+            'p50': round(percentile(latencies, 50), 2),
+            'p90': round(percentile(latencies, 90), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(latencies[-1], 2),
+        },
+        'queries': {
+            'p50': percentile(queries, 50) if queries else None,
+            'max': queries[-1] if queries else None,
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность и задержки (p50/p99) лент '
+        'на наборе seed_benchmark и пишет результат в JSON для '
+        'сравнения между коммитами или уровнями --concurrency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на сценарий',
+        )
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument(
+            '--pages', type=int, nargs='+', default=[2, SHALLOW_PAGES],
+            help=(
+                'Номера страниц главной для сценариев ?page= (до '
+                f'{SHALLOW_PAGES}; глубину меряет сценарий с курсором)'
+            ),
+        )
+        parser.add_argument(
+            '--cursor-depth', type=int, default=1000,
+            help='Глубина (в страницах) для сценария с курсором',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help=(
+                'Сколько запросов идет одновременно из потоков одного '
+                'процесса, как у serve_threaded с тем же --threads; '
+                'пропускная способность тогда считается по общему времени'
+            ),
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--label', help='По умолчанию — коммит git')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument(
+            '--compare', help='JSON прошлого запуска для сравнения'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.options = options
+        anonymous = Client()
+        readers = [
+            self.login(user) for user in User.objects.filter(
+                username__startswith=READER_PREFIX
+            )[:TARGETS]
+        ]
+        if not readers or not Post.objects.exists():
+            raise CommandError('Сначала заполните базу: seed_benchmark')
+        deep = [page for page in options['pages'] if page > SHALLOW_PAGES]
+        if deep:
+            # Такой номер открывает конец ленты, а не страницу на глубине.
+            raise CommandError(
+                f'Страницы {deep} глубже {SHALLOW_PAGES}: для глубины '
+                'есть --cursor-depth'
+            )
+
+        scenarios = {'index': [(anonymous, reverse('posts:index'))]}
+        for page in options['pages']:
+            scenarios[f'index_page_{page}'] = [
+                (anonymous, f'{reverse("posts:index")}?page={page}')
+            ]
+        scenarios['index_cursor'] = [
+            (anonymous, f'{reverse("posts:index")}?cursor={cursor}')
+            for cursor in self.deep_cursors(options['cursor_depth'])
+        ]
+        scenarios['group_posts'] = [
+            (anonymous, reverse('posts:group_list', args=(slug,)))
+            for slug in self.sample(Group.objects.values_list('slug'))
+        ]
+        scenarios['profile'] = [
+            (anonymous, reverse('posts:profile', args=(username,)))
+            for username in self.sample(
+                User.objects.filter(posts__isnull=False)
+                .values_list('username').distinct()
+            )
+        ]
+        scenarios['post_detail'] = [
+            (anonymous, reverse('posts:post_detail', args=(pk,)))
+            for pk in self.sample(
+                Post.objects.order_by('-comments_count').values_list('pk')
+            )
+        ]
+        scenarios['follow_index'] = [
+            (client, reverse('posts:follow_index')) for client in readers
+        ]
+
+        results = {}
+        for name, targets in scenarios.items():
+            if not targets:
+                continue
+            results[name] = self.measure(targets)
+            self.report(name, results[name])
+        data = {
+            'label': options['label'] or git_revision(),
+            'created': timezone.now().isoformat(),
+            'cold_cache': options['cold'],
+            'concurrency': options['concurrency'],
+            'dataset': {
+                model.__name__.lower(): model.objects.count()
+                for model in (User, Group, Post, Comment, Follow)
+            },
+            'scenarios': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as stream:
+            json.dump(data, stream, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты записаны в {options["output"]}'
+        ))
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def login(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def sample(self, rows):
+        return [row[0] for row in rows[:TARGETS]]
+
+    def deep_cursors(self, depth):
+        """Курсоры главной на глубине depth страниц и дальше."""
+        offset = depth * num_of_pub
+        keys = Post.objects.order_by(*FEED_ORDERING).values_list(
+            'pub_date', 'pk'
+        )[offset:offset + TARGETS * num_of_pub:num_of_pub]
+        return [
+            encode_cursor(AFTER, [pub_date.isoformat(), pk])
+            for pub_date, pk in keys
+        ]
+
+    def request(self, client, url):
+        if self.options['cold']:
+            cache.clear()
+        started = time.perf_counter()
+        response = client.get(url)
+        latency = time.perf_counter() - started
+        metrics = getattr(response, 'metrics', None)
+        return latency, response.status_code, metrics and metrics.queries
+
+    def measure(self, targets):
+        for _ in range(self.options['warmup']):
+            self.request(*self.random.choice(targets))
+        requests = [
+            self.random.choice(targets)
+            for _ in range(self.options['requests'])
+        ]
+        concurrency = self.options['concurrency']
+        if concurrency > 1:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                shares = [requests[number::concurrency]
+                          for number in range(concurrency)]
+                rows = [row for share in pool.map(self.run_share, shares)
+                        for row in share]
+            elapsed = time.perf_counter() - started
+        else:
+            rows = [self.request(*target) for target in requests]
+            elapsed = sum(latency for latency, _, _ in rows)
+        return summary(
+            [latency for latency, _, _ in rows],
+            [queries for _, _, queries in rows if queries is not None],
+            [status for _, status, _ in rows],
+            elapsed,
+        )
+
+    def run_share(self, share):
+        """Запросы одного потока; его соединения с базой закрываются."""
+        try:
+            return [self.request(*target) for target in share]
+        finally:
+            connections.close_all()
+
+    def report(self, name, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f'{name:18} {result["throughput_rps"]:8.1f} rps  '
+            f'p50 {latency["p50"]:7.2f} мс  p99 {latency["p99"]:7.2f} мс  '
+            f'SQL {result["queries"]["p50"]}  {result["statuses"]}'
+        )
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as stream:
+            previous = json.load(stream)
+        self.stdout.write(f'Сравнение с {previous.get("label") or path}:')
+        for name, result in results.items():
+            before = previous['scenarios'].get(name)
+            if before is None:
+                continue
+            changes = []
+            for key in ('p50', 'p99'):
+                old = before['latency_ms'][key]
+                new = result['latency_ms'][key]
+                change = (new - old) / old * 100 if old else 0
+                changes.append(
+                    f'{key} {old:.2f} → {new:.2f} мс ({change:+.0f}%)'
+                )
+            self.stdout.write(f'{name:18} ' + ', '.join(changes))
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.paginators import FEED_ORDERING, keyset_filter
+from posts.timelines import TIMELINE_ORDERING
+from posts.views import COMMENT_ORDERING, num_of_pub
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает планы и время запросов лент. Запустите до и после '
+        '`migrate posts 0013`, чтобы сравнить планы с индексами и без них.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        post = Post.objects.order_by('pk').first()
+        if post is None:
+            raise CommandError('В базе нет постов: нечего объяснять')
+        group = Group.objects.filter(posts__isnull=False).first()
+        reader = User.objects.filter(timeline__isnull=False).first()
+        follow = Follow.objects.first()
+        cursor = [post.pub_date, post.pk]
+        queries = {
+            'index': Post.objects.order_by(*FEED_ORDERING),
+            'index cursor': Post.objects.filter(
+                keyset_filter(FEED_ORDERING, cursor)
+            ).order_by(*FEED_ORDERING),
+            'profile': Post.objects.filter(
+                author_id=post.author_id
+            ).order_by(*FEED_ORDERING),
+            'comments': Comment.objects.filter(
+                post_id=post.pk
+            ).order_by(*COMMENT_ORDERING),
+        }
+        if group is not None:
+            queries['group'] = group.posts.order_by(*FEED_ORDERING)
+        if reader is not None:
+            queries['follow'] = TimelineEntry.objects.filter(
+                user=reader
+            ).order_by(*TIMELINE_ORDERING)
+        if follow is not None:
+            queries['follow exists'] = Follow.objects.filter(
+                user_id=follow.user_id, author_id=follow.author_id
+            )
+        for name, queryset in queries.items():
+            self.report(name, queryset, options['repeat'])
+
+    def report(self, name, queryset, repeat):
+        page = queryset[:num_of_pub + 1]
+        started = time.perf_counter()
+        for _ in range(repeat):
+            list(page)
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{name}: {elapsed:.2f} мс на страницу'
+        ))
+        self.stdout.write(page.explain())
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (FORMATS, TRANSFER_BATCH_SIZE, TRANSFER_MODELS,
+                            Checkpoint, Throughput, guess_format, write_rows)
+
+from .recount_posts import chunks
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии или подписки в NDJSON/CSV '
+        'пачками по первичному ключу, не загружая таблицу в память. '
+        'С --checkpoint прерванная выгрузка продолжается с места остановки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=TRANSFER_MODELS)
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='По умолчанию — по расширению файла',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=TRANSFER_BATCH_SIZE
+        )
+        parser.add_argument('--checkpoint', help='Файл с прогрессом выгрузки')
+
+    def handle(self, *args, **options):
+        name, path = options['model'], options['path']
+        model, fields = TRANSFER_MODELS[name]
+        fmt = options['format'] or guess_format(path)
+        batch_size = options['batch_size']
+        checkpoint = Checkpoint(options['checkpoint'])
+        offset = checkpoint.get('offset', 0)
+        stats = Throughput(checkpoint.get('rows', 0))
+        rows = (
+            model.objects.filter(pk__gt=checkpoint.get('last_pk', 0))
+            .order_by('pk').values_list(*fields)
+            .iterator(chunk_size=batch_size)
+        )
+        with open(path, 'r+' if offset else 'w',
+                  newline='', encoding='utf-8') as stream:
+            if offset:
+                # Хвост после последней сохраненной пачки недописан.
+                stream.seek(offset)
+                stream.truncate()
+            else:
+                write_rows(stream, fmt, fields, [])
+            for chunk in chunks(rows, batch_size):
+                write_rows(stream, fmt, fields, chunk, header=False)
+                stream.flush()
+                stats.add(len(chunk))
+                checkpoint.save(
+                    rows=stats.done, last_pk=chunk[-1][0], offset=stream.tell()
+                )
+                self.stdout.write(f'{name}: {stats}')
+        checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(f'Выгружено {name}: {stats}'))
@@ -0,0 +1,45 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.tasks import init_worker
+from posts.models import Post
+from posts.thumbnails import THUMBNAIL_WORKERS, generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Создает недостающие миниатюры для уже загруженных картинок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=THUMBNAIL_WORKERS)
+        parser.add_argument('--chunk-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image='')
+            .order_by()
+            .values_list('image', flat=True)
+            .distinct()
+            .iterator()
+        )
+        done = 0
+        if not options['workers']:
+            # Без пула: удобно для отладки и тестовой базы в памяти.
+            for done, name in enumerate(map(generate_thumbnails, names), 1):
+                self.report(name, options)
+        else:
+            with ProcessPoolExecutor(max_workers=options['workers'],
+                                     initializer=init_worker) as executor:
+                results = executor.map(
+                    generate_thumbnails, names,
+                    chunksize=options['chunk_size']
+                )
+                for done, name in enumerate(results, 1):
+                    self.report(name, options)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done}'
+        ))
+
+    def report(self, name, options):
+        if options['verbosity'] > 1:
+            self.stdout.write(name)
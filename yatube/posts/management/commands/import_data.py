@@ -0,0 +1,93 @@
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.models import Post
+from posts.transfer import (FORMATS, TRANSFER_BATCH_SIZE, TRANSFER_MODELS,
+                            Checkpoint, Throughput, fill_timelines,
+                            guess_format, keep_auto_now_add, model_field,
+                            read_rows, refresh_caches, to_python)
+
+from .recount_posts import chunks
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии или подписки из NDJSON/CSV '
+        'через bulk_create пачками. Сигналы при этом не срабатывают, '
+        'поэтому после каждой пачки команда сама сбрасывает кеши лент '
+        'и раздает посты и подписки в ленты подписок, а после загрузки '
+        'пересчитывает счетчики и поисковый индекс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=TRANSFER_MODELS)
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='По умолчанию — по расширению файла',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=TRANSFER_BATCH_SIZE
+        )
+        parser.add_argument('--checkpoint', help='Файл с прогрессом загрузки')
+        parser.add_argument(
+            '--skip-recount',
+            action='store_true',
+            help='Не пересчитывать счетчики и индекс (для серии загрузок)',
+        )
+
+    def handle(self, *args, **options):
+        name, path = options['model'], options['path']
+        self.model, fields = TRANSFER_MODELS[name]
+        self.fields = {
+            attname: model_field(self.model, attname) for attname in fields
+        }
+        fmt = options['format'] or guess_format(path)
+        checkpoint = Checkpoint(options['checkpoint'])
+        stats = Throughput(checkpoint.get('rows', 0))
+        with open(path, newline='', encoding='utf-8') as stream, \
+                keep_auto_now_add(self.model):
+            rows = islice(read_rows(stream, fmt), stats.done, None)
+            for chunk in chunks(rows, options['batch_size']):
+                objects = [
+                    self.build(row, stats.done + number)
+                    for number, row in enumerate(chunk, 1)
+                ]
+                # Первичные ключи берутся из файла, поэтому повтор пачки
+                # после сбоя до записи прогресса не создает дублей.
+                with transaction.atomic():
+                    self.model.objects.bulk_create(
+                        objects, ignore_conflicts=True
+                    )
+                refresh_caches(self.model, objects)
+                fill_timelines(self.model, objects)
+                stats.add(len(chunk))
+                checkpoint.save(rows=stats.done)
+                self.stdout.write(f'{name}: {stats}')
+        checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(f'Загружено {name}: {stats}'))
+        if not options['skip_recount']:
+            call_command('recount_posts', stdout=self.stdout)
+            if self.model is Post:
+                call_command('rebuild_search_index', stdout=self.stdout)
+
+    def build(self, row, number):
+        values = {}
+        for attname, field in self.fields.items():
+            if attname not in row:
+                continue
+            try:
+                values[attname] = to_python(field, row[attname])
+            except ValidationError as error:
+                raise CommandError(
+                    f'Строка {number}, поле {attname}: {error.messages[0]}'
+                )
+        instance = self.model(**values)
+        if self.model is Post:
+            instance.last_activity = instance.pub_date
+        return instance
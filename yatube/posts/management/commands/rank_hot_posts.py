@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.hot import HOT_BATCH_SIZE, recompute
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг «Популярного» для постов, затронутых '
+        'с прошлого запуска. Запускайте по cron или с --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=HOT_BATCH_SIZE)
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать все посты окна, а не только затронутые',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Повторять пересчет каждые N секунд (0 — один раз)',
+        )
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            started = time.perf_counter()
+            ranked = recompute(full=full, batch_size=options['batch_size'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'Пересчитано постов: {ranked} за {elapsed:.2f} с'
+            ))
+            if not options['interval']:
+                return
+            full = False
+            time.sleep(options['interval'])
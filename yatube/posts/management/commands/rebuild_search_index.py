@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.search import get_backend
+
+from .recount_posts import BATCH_SIZE, chunks
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковый индекс постов. Нужна после загрузки '
+        'постов в обход сигналов (bulk_create, loaddata) или смены стеммера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        rows = Post.objects.order_by('pk').values_list('pk', 'text')
+        started = time.perf_counter()
+        indexed = 0
+        with transaction.atomic():
+            backend.clear()
+            for chunk in chunks(rows.iterator(), options['batch_size']):
+                backend.index_many(chunk)
+                indexed += len(chunk)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed} за {elapsed:.1f} с'
+        ))
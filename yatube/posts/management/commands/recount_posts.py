@@ -0,0 +1,147 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.caching import author_feed, bump_feeds, group_feed, post_feeds
+from posts.models import Follow, Group, Post, User, UserStats
+
+BATCH_SIZE: int = 1000
+STATS_FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def count_of(model, field):
+    """Подзапрос с числом строк model, ссылающихся на пользователя."""
+    rows = (
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счетчики постов, подписчиков и подписок авторов, '
+        'постов групп, комментариев постов и чинит расхождения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не записывать',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        groups = self.repair_groups()
+        users = self.repair_users()
+        posts = self.repair_posts()
+        verb = 'Найдено' if self.dry_run else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} расхождений: групп — {groups}, авторов — {users}, '
+            f'постов — {posts}'
+        ))
+
+    def repair_groups(self):
+        rows = (
+            Group.objects.order_by('pk')
+            .annotate(actual=Count('posts'))
+            .values_list('pk', 'posts_count', 'actual')
+        )
+        repaired = 0
+        for chunk in chunks(rows.iterator(), self.batch_size):
+            drift = [
+                Group(pk=pk, posts_count=actual)
+                for pk, stored, actual in chunk if stored != actual
+            ]
+            repaired += len(drift)
+            if drift and not self.dry_run:
+                Group.objects.bulk_update(drift, ['posts_count'])
+                bump_feeds(*(group_feed(group.pk) for group in drift))
+        return repaired
+
+    def repair_users(self):
+        # Счетчики через подзапросы: несколько Count по join-ам
+        # перемножили бы строки постов, подписчиков и подписок.
+        rows = (
+            User.objects.order_by('pk')
+            .annotate(
+                actual_posts=count_of(Post, 'author'),
+                actual_followers=count_of(Follow, 'author'),
+                actual_following=count_of(Follow, 'user'),
+            )
+            .values_list(
+                'pk', *(f'stats__{field}' for field in STATS_FIELDS),
+                'actual_posts', 'actual_followers', 'actual_following',
+            )
+        )
+        size = len(STATS_FIELDS)
+        repaired = 0
+        for chunk in chunks(rows.iterator(), self.batch_size):
+            missing, drift = [], []
+            for pk, *counters in chunk:
+                stored, actual = counters[:size], counters[size:]
+                stats = UserStats(
+                    user_id=pk, **dict(zip(STATS_FIELDS, actual))
+                )
+                if stored[0] is None:
+                    missing.append(stats)
+                elif stored != actual:
+                    drift.append(stats)
+            repaired += len(missing) + len(drift)
+            if self.dry_run:
+                continue
+            with transaction.atomic():
+                UserStats.objects.bulk_create(missing)
+                if drift:
+                    UserStats.objects.bulk_update(drift, STATS_FIELDS)
+            bump_feeds(*(
+                author_feed(stats.user_id) for stats in missing + drift
+            ))
+        return repaired
+
+    def repair_posts(self):
+        rows = (
+            Post.objects.order_by('pk')
+            .annotate(
+                actual_count=Count('comments'),
+                actual_activity=Coalesce(Max('comments__created'), 'pub_date'),
+            )
+            .values_list(
+                'pk', 'author_id', 'group_id', 'comments_count',
+                'last_activity', 'actual_count', 'actual_activity',
+            )
+        )
+        repaired = 0
+        for chunk in chunks(rows.iterator(), self.batch_size):
+            drift = [
+                Post(pk=pk, author_id=author_id, group_id=group_id,
+                     comments_count=count, last_activity=activity)
+                for (pk, author_id, group_id, stored_count, stored_activity,
+                     count, activity) in chunk
+                if (stored_count, stored_activity) != (count, activity)
+            ]
+            repaired += len(drift)
+            if drift and not self.dry_run:
+                Post.objects.bulk_update(
+                    drift, ['comments_count', 'last_activity']
+                )
+                bump_feeds(*(
+                    feed for post in drift
+                    for feed in post_feeds(post.author_id, post.group_id)
+                ))
+        return repaired
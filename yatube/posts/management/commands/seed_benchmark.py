@@ -0,0 +1,216 @@
+import random
+from array import array
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+
+from posts import timelines
+from posts.models import Comment, Follow, Group, Post, User
+from posts.transfer import Throughput, keep_auto_now_add, refresh_caches
+
+from .recount_posts import chunks
+
+USER_PREFIX = 'bench_user_'
+# Читатели, от имени которых benchmark_views открывает ленту подписок.
+READER_PREFIX = 'bench_reader_'
+GROUP_PREFIX = 'bench-'
+SEED_BATCH_SIZE: int = 5000
+# Тексты постов и комментариев берутся из заранее сгенерированного
+# набора: Faker на миллион постов работал бы дольше самой загрузки.
+TEXT_POOL: int = 2000
+# Доля постов в группах и «хвост» популярности авторов (Парето).
+GROUP_SHARE = 0.7
+POPULARITY_ALPHA = 1.2
+
+
+def next_pk(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует воспроизводимый набор данных для benchmark_views: '
+        'пользователей, группы, посты, комментарии и плотный граф '
+        'подписок с популярными авторами. Счетчики, поисковый индекс '
+        'и ленты подписок читателей заполняются после загрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument(
+            '--readers', type=int, default=50,
+            help='Сколько пользователей получат заполненные ленты подписок',
+        )
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок на пользователя',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить посты',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE)
+        parser.add_argument(
+            '--skip-search-index', action='store_true',
+            help='Не перестраивать поисковый индекс',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        # mixer берет значения из общего Faker и модуля random.
+        random.seed(options['seed'])
+        Faker.seed(options['seed'])
+        faker = Faker('ru_RU')
+        self.texts = [
+            faker.text(max_nb_chars=self.random.choice((80, 200, 600)))
+            for _ in range(TEXT_POOL)
+        ]
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days']).total_seconds()
+
+        self.user_ids = self.create_users(
+            options['users'], options['readers']
+        )
+        self.group_ids = self.create_groups(options['groups'])
+        self.create_follows(options['follows'])
+        self.post_ids, self.post_times = self.create_posts(options['posts'])
+        self.create_comments(options['comments'])
+
+        call_command('recount_posts', stdout=self.stdout)
+        if not options['skip_search_index']:
+            call_command('rebuild_search_index', stdout=self.stdout)
+        self.fill_timelines()
+        self.stdout.write(self.style.SUCCESS('Набор данных готов'))
+
+    def save(self, model, objects, label):
+        stats = Throughput()
+        with keep_auto_now_add(model):
+            for chunk in chunks(objects, self.batch_size):
+                with transaction.atomic():
+                    model.objects.bulk_create(chunk, ignore_conflicts=True)
+                refresh_caches(model, chunk)
+                stats.add(len(chunk))
+                self.stdout.write(f'{label}: {stats}')
+
+    def create_users(self, count, readers):
+        start = next_pk(User)
+        ids = list(range(start, start + count))
+
+        def users():
+            with mixer.ctx(commit=False):
+                for number, pk in enumerate(ids):
+                    prefix = READER_PREFIX if number < readers else USER_PREFIX
+                    yield mixer.blend(
+                        User, pk=pk, username=f'{prefix}{pk}', password='!',
+                        is_staff=False, is_superuser=False, is_active=True,
+                    )
+        self.save(User, users(), 'пользователи')
+        return ids
+
+    def create_groups(self, count):
+        start = next_pk(Group)
+        ids = list(range(start, start + count))
+        with mixer.ctx(commit=False):
+            groups = [
+                mixer.blend(
+                    Group, pk=pk, slug=f'{GROUP_PREFIX}{pk}', posts_count=0
+                )
+                for pk in ids
+            ]
+        self.save(Group, groups, 'группы')
+        return ids
+
+    def popular_author(self, ranking):
+        """Автор из ranking с вероятностью по закону Парето."""
+        index = int(self.random.paretovariate(POPULARITY_ALPHA)) - 1
+        return ranking[min(index, len(ranking) - 1)]
+
+    def create_follows(self, per_user):
+        # Популярность не совпадает с порядком id: читатели идут первыми.
+        ranking = self.user_ids[:]
+        self.random.shuffle(ranking)
+        per_user = min(per_user, len(ranking) - 1)
+
+        def follows():
+            for user_id in self.user_ids:
+                authors = set()
+                for _ in range(per_user * 10):
+                    if len(authors) == per_user:
+                        break
+                    author_id = self.popular_author(ranking)
+                    if author_id != user_id:
+                        authors.add(author_id)
+                for author_id in sorted(authors):
+                    yield Follow(
+                        user_id=user_id, author_id=author_id,
+                        created=self.past(self.random.random() * self.span),
+                    )
+        self.save(Follow, follows(), 'подписки')
+
+    def past(self, seconds):
+        return self.now - timedelta(seconds=seconds)
+
+    def create_posts(self, count):
+        start = next_pk(Post)
+        ids = range(start, start + count)
+        # Смещения дат от now в секундах: нужны комментариям.
+        ages = array('d', (self.random.random() * self.span for _ in ids))
+
+        def posts():
+            for pk, age in zip(ids, ages):
+                pub_date = self.past(age)
+                group_id = None
+                if self.random.random() < GROUP_SHARE:
+                    group_id = self.random.choice(self.group_ids)
+                yield Post(
+                    pk=pk,
+                    text=self.random.choice(self.texts),
+                    author_id=self.random.choice(self.user_ids),
+                    group_id=group_id,
+                    pub_date=pub_date,
+                    last_activity=pub_date,
+                )
+        self.save(Post, posts(), 'посты')
+        return ids, ages
+
+    def create_comments(self, count):
+        start = next_pk(Comment)
+
+        def comments():
+            for pk in range(start, start + count):
+                index = self.random.randrange(len(self.post_ids))
+                age = self.post_times[index]
+                yield Comment(
+                    pk=pk,
+                    post_id=self.post_ids[index],
+                    author_id=self.random.choice(self.user_ids),
+                    text=self.random.choice(self.texts),
+                    created=self.past(age * self.random.random()),
+                )
+        self.save(Comment, comments(), 'комментарии')
+
+    def fill_timelines(self):
+        """Ленты подписок читателей — как backfill при подписке."""
+        follows = Follow.objects.filter(
+            user__username__startswith=READER_PREFIX
+        ).values_list(
+            'user_id', 'author_id', 'author__stats__followers_count'
+        )
+        stats = Throughput()
+        for user_id, author_id, followers_count in list(follows):
+            # Популярные авторы подтягиваются при чтении ленты.
+            if not timelines.is_heavy_author(followers_count):
+                timelines.backfill(user_id, author_id)
+            stats.add(1)
+        self.stdout.write(f'ленты подписок: {stats}')
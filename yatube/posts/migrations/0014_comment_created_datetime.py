@@ -0,0 +1,76 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:23
+
+import datetime
+from itertools import groupby
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def created_datetimes(pub_date, times):
+    """
+    Даты для времен комментариев поста в порядке id: первый день — день
+    публикации, а если время суток идет назад (раньше поста или
+    предыдущего комментария), значит наступил следующий день.
+    """
+    pub_date = timezone.localtime(pub_date, timezone.utc)
+    day, previous = pub_date.date(), pub_date.time().replace(tzinfo=None)
+    for time in times:
+        if time < previous:
+            day += datetime.timedelta(days=1)
+        previous = time
+        yield timezone.make_aware(
+            datetime.datetime.combine(day, time), timezone.utc
+        )
+
+
+def fill_created(apps, schema_editor):
+    # Дата в TimeField не хранилась: восстанавливаем ее от дня публикации
+    # поста (часы в базе записаны в UTC, как и pub_date).
+    Comment = apps.get_model('posts', 'Comment')
+    comments = Comment.objects.order_by('post_id', 'id').values_list(
+        'post_id', 'pk', 'post__pub_date', 'created_time'
+    )
+    for _, rows in groupby(comments.iterator(), key=lambda row: row[0]):
+        rows = list(rows)
+        dates = created_datetimes(rows[0][2], [row[3] for row in rows])
+        for row, created in zip(rows, dates):
+            Comment.objects.filter(pk=row[1]).update(created=created)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_add_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_post_created_idx',
+        ),
+        migrations.RenameField(
+            model_name='comment',
+            old_name='created',
+            new_name='created_time',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='created',
+            field=models.DateTimeField(null=True, verbose_name='Время комментария'),
+        ),
+        migrations.RunPython(fill_created, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='comment',
+            name='created_time',
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Время комментария'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created', 'id'], name='comment_post_created_id_idx'),
+        ),
+    ]
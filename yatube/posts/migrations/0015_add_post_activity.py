@@ -0,0 +1,59 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:41
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_activity(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Post = apps.get_model('posts', 'Post')
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by()
+    Post.objects.update(
+        comments_count=Coalesce(Subquery(
+            comments.values('post').annotate(total=Count('pk'))
+            .values('total')
+        ), 0),
+        last_activity=Coalesce(Subquery(
+            comments.values('post').annotate(last=Max('created'))
+            .values('last')
+        ), 'pub_date'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_comment_created_datetime'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_activity',
+            field=models.DateTimeField(null=True, verbose_name='Последняя активность'),
+        ),
+        migrations.RunPython(fill_activity, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='post',
+            name='last_activity',
+            field=models.DateTimeField(auto_now_add=True, help_text='Время последнего комментария или публикации', verbose_name='Последняя активность'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-last_activity', '-id'], name='post_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-last_activity', '-id'], name='post_group_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-last_activity', '-id'], name='post_author_activity_idx'),
+        ),
+    ]
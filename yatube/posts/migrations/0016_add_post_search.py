@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:02
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def create_index(apps, schema_editor):
+    from posts.search import get_backend
+
+    backend = get_backend()
+    backend.install(schema_editor.connection)
+    Post = apps.get_model('posts', 'Post')
+    rows = Post.objects.order_by('pk').values_list('pk', 'text')
+    batch = []
+    for row in rows.iterator():
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            backend.index_many(batch)
+            batch = []
+    backend.index_many(batch)
+
+
+def drop_index(apps, schema_editor):
+    from posts.search import get_backend
+
+    get_backend().uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_add_post_activity'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
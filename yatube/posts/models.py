@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model
 from django.db import models
 
 NUM_OF_WORDS = 15
+# Меняются только атомарными UPDATE из сигналов комментариев.
+POST_COUNTER_FIELDS = ('comments_count', 'last_activity')
 User = get_user_model()
 
 
@@ -11,6 +13,8 @@ class Group(models.Model):
     slug = models.SlugField(unique=True,
                             verbose_name='Уникальный URL')
     description = models.TextField(verbose_name='Описание')
+    posts_count = models.PositiveIntegerField(default=0,
+                                              verbose_name='Число постов')
 
     def __str__(self):
         return f'{self.title}'
@@ -41,12 +45,83 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментариев'
+    )
+    last_activity = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Последняя активность',
+        help_text='Время последнего комментария или публикации'
+    )
+    updated = models.DateTimeField(auto_now=True,
+                                   verbose_name='Дата изменения')
 
     def __str__(self):
         return self.text[:NUM_OF_WORDS]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_state()
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Сохранение формы не должно затирать счетчики,
+        # изменившиеся с момента чтения поста.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in POST_COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def remember_state(self):
+        """Запоминает автора и группу, чтобы поправить счетчики при смене."""
+        self._loaded_author_id = self.__dict__.get('author_id')
+        self._loaded_group_id = self.__dict__.get('group_id')
+
     class Meta:
-        ordering = ("-pub_date",)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_pub_date_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('-last_activity', '-id'),
+                         name='post_activity_idx'),
+            models.Index(fields=('group', '-last_activity', '-id'),
+                         name='post_group_activity_idx'),
+            models.Index(fields=('author', '-last_activity', '-id'),
+                         name='post_author_activity_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(default=0,
+                                              verbose_name='Число постов')
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписок'
+    )
+
+    def __str__(self):
+        return f'{self.user}'
 
 
 class Comment(models.Model):
@@ -63,8 +138,14 @@ class Comment(models.Model):
     )
     text = models.TextField(verbose_name='Текст комментария',
                             help_text='Поделитесь своим мнением')
-    created = models.TimeField(auto_now_add=True,
-                               verbose_name='Время комментария')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Время комментария')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('post', 'created', 'id'),
+                         name='comment_post_created_id_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -80,3 +161,76 @@ class Follow(models.Model):
         verbose_name='Блоггер',
         on_delete=models.CASCADE
     )
+    # У подписок, оформленных до появления поля, времени нет.
+    created = models.DateTimeField(auto_now_add=True, null=True,
+                                   verbose_name='Время подписки')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='unique_follow'),
+            models.CheckConstraint(check=~models.Q(user=models.F('author')),
+                                   name='prevent_self_follow'),
+        ]
+        indexes = [
+            models.Index(fields=('created',), name='follow_created_idx'),
+            models.Index(fields=('author', 'created'),
+                         name='follow_author_created_idx'),
+            # Списки подписчиков и подписок листаются по ключу id.
+            models.Index(fields=('author', '-id'),
+                         name='follow_author_id_idx'),
+            models.Index(fields=('user', '-id'), name='follow_user_id_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя (раздача при публикации)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='unique_timeline_post'),
+        ]
+        indexes = [
+            models.Index(fields=('user', '-pub_date', '-post'),
+                         name='timeline_user_pub_date_idx'),
+            models.Index(fields=('user', 'author'),
+                         name='timeline_user_author_idx'),
+        ]
+
+
+class HotPost(models.Model):
+    """Рейтинг поста в ленте «Популярное» (см. posts.hot)."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='hot',
+    )
+    score = models.FloatField(verbose_name='Рейтинг')
+    computed_at = models.DateTimeField(verbose_name='Пересчитан')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('-score', '-post'), name='hot_score_idx'),
+            models.Index(fields=('computed_at',), name='hot_computed_idx'),
+        ]
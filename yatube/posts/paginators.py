@@ -0,0 +1,378 @@
+import base64
+import binascii
+import datetime
+import json
+import math
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import (EmptyPage, InvalidPage, Page,
+                                   PageNotAnInteger, Paginator)
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+FEED_ORDERING = ('-pub_date', '-pk')
+ACTIVITY_ORDERING = ('-last_activity', '-pk')
+SHALLOW_PAGES: int = 5
+# Сколько соседних номеров страниц показывать по обе стороны от текущей.
+PAGE_WINDOW: int = 2
+
+AFTER = 'a'
+BEFORE = 'b'
+# Курсор конца ленты для ссылки «Последняя».
+LAST = 'last'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def page_query(params, query='', **extra):
+    """
+    Строка запроса для другой страницы: page/cursor из params
+    заменяются на query и extra, остальные параметры сохраняются.
+    """
+    params = params.copy()
+    params.pop('page', None)
+    params.pop('cursor', None)
+    for key, value in extra.items():
+        params[key] = value
+    return '&'.join(part for part in (params.urlencode(), query) if part)
+
+
+def _resolve(obj, field):
+    """Достает значение поля ключа, в том числе через связи `a__b`."""
+    for attr in field.lstrip('-').split('__'):
+        obj = getattr(obj, attr)
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    return obj
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps([direction, list(values)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def ordering_field(model, name):
+    """Поле модели, по которому идет сортировка name (`-a__b`, `pk`)."""
+    *path, last = name.lstrip('-').split('__')
+    for part in path:
+        model = model._meta.get_field(part).related_model
+    field = model._meta.pk if last == 'pk' else model._meta.get_field(last)
+    return field.target_field if field.is_relation else field
+
+
+def _cursor_value(field, value):
+    value = field.to_python(value)
+    if value is None or (isinstance(value, float)
+                         and not math.isfinite(value)):
+        raise ValueError(value)
+    return value
+
+
+def decode_cursor(cursor, fields):
+    """
+    Направление и значения ключа из курсора. Курсор приходит из адреса,
+    поэтому каждое значение проверяется полем сортировки: подделка
+    дает InvalidCursor, а не ошибку в запросе.
+    """
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in (AFTER, BEFORE) or len(values) != len(fields):
+            raise ValueError(direction)
+        values = [
+            _cursor_value(field, value)
+            for field, value in zip(fields, values)
+        ]
+    except (binascii.Error, TypeError, ValueError, ValidationError):
+        raise InvalidCursor('Некорректный курсор')
+    return direction, values
+
+
+def keyset_filter(ordering, values, forward=True):
+    """
+    Условие «строго после ключа» (или «строго до» при forward=False)
+    для сортировки ordering. Первое поле вынесено в отдельное
+    нестрогое сравнение, чтобы база могла пройти по индексу диапазоном.
+    """
+    conditions = Q()
+    for position, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition = Q(**{f'{name}__{lookup}': values[position]})
+        for prev_field, prev_value in zip(ordering[:position],
+                                          values[:position]):
+            condition &= Q(**{prev_field.lstrip('-'): prev_value})
+        conditions |= condition
+    first = ordering[0].lstrip('-')
+    descending = ordering[0].startswith('-')
+    lookup = 'lte' if descending == forward else 'gte'
+    return Q(**{f'{first}__{lookup}': values[0]}) & conditions
+
+
+class CursorPage(Page):
+    """
+    Страница ленты. Неглубокие страницы нумеруются как обычно,
+    дальше пагинация идет по курсору (number is None).
+    """
+
+    def __init__(self, object_list, number, paginator,
+                 has_next=None, has_previous=None):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    @property
+    def is_cursor(self):
+        return self.number is None
+
+    def has_next(self):
+        if self._has_next is None:
+            return super().has_next()
+        return self._has_next
+
+    def has_previous(self):
+        if self._has_previous is None:
+            return super().has_previous()
+        return self._has_previous
+
+    def _last_number(self):
+        """Номер последней страницы или None, если он неизвестен."""
+        if self.is_cursor:
+            return None
+        if not self.has_next():
+            return self.number
+        if self.paginator.counted:
+            return max(self.paginator.num_pages, self.number + 1)
+        return None
+
+    @property
+    def page_window(self):
+        """Номера соседних страниц: не больше window в каждую сторону."""
+        if self.is_cursor:
+            return range(0)
+        paginator = self.paginator
+        last = min(self.number + paginator.window, paginator.shallow_pages)
+        last = min(last, self._last_number() or self.number + 1)
+        return range(max(self.number - paginator.window, 1), last + 1)
+
+    def _cursor(self, obj, direction):
+        return encode_cursor(direction, self.paginator.cursor_values(obj))
+
+    @property
+    def next_cursor(self):
+        if not self.has_next() or not self.object_list:
+            return None
+        return self._cursor(self.object_list[len(self) - 1], AFTER)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return self._cursor(self.object_list[0], BEFORE)
+
+    @property
+    def next_query(self):
+        """Параметры запроса для ссылки «Следующая»."""
+        if not self.has_next():
+            return ''
+        if (not self.is_cursor
+                and self.number < self.paginator.shallow_pages):
+            return f'page={self.next_page_number()}'
+        return f'cursor={self.next_cursor}'
+
+    @property
+    def previous_query(self):
+        """Параметры запроса для ссылки «Предыдущая»."""
+        if not self.has_previous():
+            return ''
+        if not self.is_cursor:
+            return f'page={self.previous_page_number()}'
+        return f'cursor={self.previous_cursor}'
+
+    @property
+    def last_query(self):
+        """
+        Параметры ссылки «Последняя»: номер страницы, если конец ленты
+        в неглубоком окне, иначе курсор конца ленты.
+        """
+        last = self._last_number()
+        if last is not None and last <= self.paginator.shallow_pages:
+            return f'page={last}'
+        return f'cursor={LAST}'
+
+    @property
+    def cache_key(self):
+        """Часть ключа кеша, однозначно задающая страницу."""
+        if self.is_cursor:
+            return self.paginator.cursor
+        return self.number
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинатор ленты по ключу (pub_date, pk).
+
+    Первые shallow_pages страниц доступны по номеру (OFFSET там дешев),
+    глубже лента листается курсором: запрос `WHERE key < cursor LIMIT n+1`
+    стоит одинаково на любой глубине.
+
+    COUNT(*) пагинатор не делает: has_next определяется по лишней
+    строке страницы, а число записей (счетчик или оценка из кеша)
+    нужно только ссылке «Последняя». Без него она ведет на курсор
+    конца ленты.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING,
+                 shallow_pages=SHALLOW_PAGES, count=None, window=PAGE_WINDOW,
+                 **kwargs):
+        super().__init__(object_list.order_by(*ordering), per_page, **kwargs)
+        self.ordering = ordering
+        self.shallow_pages = shallow_pages
+        self.window = window
+        self.cursor = None
+        self.counted = count is not None
+        if self.counted:
+            self.__dict__['count'] = count
+
+    def cursor_values(self, obj):
+        """Значения ключа сортировки для объекта страницы."""
+        return [_resolve(obj, field) for field in self.ordering]
+
+    def validate_number(self, number):
+        """
+        Проверка номера без COUNT(*). Номера глубже shallow_pages нет:
+        get_page отдает вместо них конец ленты по курсору LAST, а не
+        чужую страницу под этим номером.
+        """
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не является целым числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        if number > self.shallow_pages:
+            raise EmptyPage('Глубокие страницы листаются курсором')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('На этой странице нет результатов')
+        return self._get_page(
+            rows[:self.per_page], number, self,
+            has_next=len(rows) > self.per_page,
+            has_previous=number > 1,
+        )
+
+    def get_page(self, number=None, cursor=None):
+        if cursor == LAST:
+            return self.last_page()
+        if cursor:
+            try:
+                return self.cursor_page(cursor)
+            except InvalidCursor:
+                pass
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            return self.last_page()
+
+    def last_page(self):
+        """Конец ленты: первые строки в обратном порядке, без OFFSET."""
+        rows = list(self.object_list.reverse()[:self.per_page + 1])
+        if len(rows) <= self.per_page:
+            return self.page(1)
+        rows = rows[:self.per_page]
+        rows.reverse()
+        self.cursor = LAST
+        return self._get_page(
+            rows, None, self, has_next=False, has_previous=True
+        )
+
+    def cursor_page(self, cursor):
+        direction, values = decode_cursor(cursor, [
+            ordering_field(self.object_list.model, name)
+            for name in self.ordering
+        ])
+        forward = direction == AFTER
+        queryset = self.object_list.filter(
+            keyset_filter(self.ordering, values, forward)
+        )
+        if not forward:
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+        if not forward and not has_more:
+            # Дошли до начала ленты: отдаем обычную первую страницу.
+            return self.page(1)
+        self.cursor = cursor
+        return self._get_page(
+            rows, None, self,
+            has_next=has_more if forward else True,
+            has_previous=True if forward else has_more,
+        )
+
+    def _get_page(self, *args, **kwargs):
+        return CursorPage(*args, **kwargs)
+
+
+class TimelinePaginator(CursorPaginator):
+    """
+    Лента подписок: листаются записи TimelineEntry по их собственному
+    индексу, а на странице оказываются сами посты.
+    """
+
+    def cursor_values(self, post):
+        return [_resolve(post, 'pub_date'), post.pk]
+
+    def _get_page(self, object_list, *args, **kwargs):
+        posts = [entry.post for entry in object_list]
+        return super()._get_page(posts, *args, **kwargs)
+
+
+class HotPaginator(CursorPaginator):
+    """Лента «Популярное»: листаются записи HotPost по рейтингу."""
+
+    def cursor_values(self, post):
+        return [post.hot_score, post.pk]
+
+    def _get_page(self, object_list, *args, **kwargs):
+        posts = []
+        for hot in object_list:
+            hot.post.hot_score = hot.score
+            posts.append(hot.post)
+        return super()._get_page(posts, *args, **kwargs)
+
+
+class RankedPaginator(Paginator):
+    """
+    Нумерованная выдача по релевантности (поиск). Ключа для курсора
+    здесь нет, поэтому глубже max_pages страниц выдача не листается.
+    """
+
+    counted = True
+
+    def __init__(self, object_list, per_page, max_pages=SHALLOW_PAGES,
+                 window=PAGE_WINDOW, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.shallow_pages = max_pages
+        self.window = window
+
+    @cached_property
+    def num_pages(self):
+        return min(super().num_pages, self.shallow_pages)
+
+    def _get_page(self, *args, **kwargs):
+        return CursorPage(*args, **kwargs)
@@ -0,0 +1,276 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+from core.tasks import task
+
+from .feeds import feed_queryset
+from .models import Post
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-я]')
+VOWELS = 'аеиоуыэюя'
+
+# Окончания стеммера Портера для русского языка (Snowball).
+# Окончания первых групп удаляются, только если перед ними «а» или «я».
+PERFECTIVE_GERUND_RE = re.compile(
+    r'((?<=[ая])(в|вши|вшись)|(ив|ивши|ившись|ыв|ывши|ывшись))$'
+)
+ADJECTIVE = (
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)'
+)
+ADJECTIVAL_RE = re.compile(
+    r'(((?<=[ая])(ем|нн|вш|ющ|щ))|(ивш|ывш|ующ))?' + ADJECTIVE + '$'
+)
+REFLEXIVE_RE = re.compile(r'(ся|сь)$')
+VERB_RE = re.compile(
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)|'
+    r'(ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|'
+    r'ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю))$'
+)
+NOUN_RE = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL_RE = re.compile(r'(ост|ость)$')
+SUPERLATIVE_RE = re.compile(r'(ейше|ейш)$')
+
+
+def _region(word, start=0):
+    """Часть слова после первой пары «гласная + согласная» (R1, R2)."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _cut(regex, word):
+    """Отрезает окончание, если оно есть: (слово, отрезано ли)."""
+    stripped = regex.sub('', word, count=1)
+    return stripped, stripped != word
+
+
+def stem(word):
+    """Основа русского слова; остальные слова возвращаются как есть."""
+    if not CYRILLIC_RE.search(word):
+        return word
+    rv_start = next(
+        (index + 1 for index, letter in enumerate(word) if letter in VOWELS),
+        len(word),
+    )
+    prefix, rv = word[:rv_start], word[rv_start:]
+    r2_start = max(_region(word, _region(word)) - rv_start, 0)
+
+    rv, found = _cut(PERFECTIVE_GERUND_RE, rv)
+    if not found:
+        rv, _ = _cut(REFLEXIVE_RE, rv)
+        for regex in (ADJECTIVAL_RE, VERB_RE, NOUN_RE):
+            rv, found = _cut(regex, rv)
+            if found:
+                break
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL_RE.search(rv[r2_start:]):
+        rv, _ = _cut(DERIVATIONAL_RE, rv)
+    rv, found = _cut(SUPERLATIVE_RE, rv)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not found and rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
+
+
+def tokenize(text):
+    """Основы слов текста в нижнем регистре, «ё» приравнена к «е»."""
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [stem(word) for word in words]
+
+
+class SearchResults:
+    """
+    Ленивая выдача поиска для Paginator: count() и срезы идут
+    в индекс, посты страницы затем приходят одним запросом.
+    """
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+
+    def count(self):
+        return self._count
+
+    @cached_property
+    def _count(self):
+        return self.backend.count(self.query)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        offset = item.start or 0
+        ids = self.backend.ranked_ids(self.query, offset, item.stop - offset)
+        posts = feed_queryset(Post.objects).in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+class SearchBackend:
+    """
+    Интерфейс поискового индекса постов. Базовая реализация ничего
+    не индексирует и ищет через LIKE — годится для баз без полнотекстового
+    поиска; свой бэкенд подключается настройкой POSTS_SEARCH_BACKEND.
+    """
+
+    def install(self, connection):
+        """Создает хранилище индекса (вызывается из миграции)."""
+
+    def uninstall(self, connection):
+        """Удаляет хранилище индекса."""
+
+    def index(self, post_id, text):
+        """Добавляет или обновляет пост в индексе."""
+
+    def index_many(self, rows):
+        for post_id, text in rows:
+            self.index(post_id, text)
+
+    def remove(self, post_id):
+        """Убирает пост из индекса."""
+
+    def clear(self):
+        """Очищает индекс перед полной перестройкой."""
+
+    def filter(self, queryset, query):
+        """Оставляет в queryset посты, подходящие под запрос."""
+        for word in WORD_RE.findall(query):
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+
+    def count(self, query):
+        return self.filter(Post.objects.all(), query).count()
+
+    def ranked_ids(self, query, offset, limit):
+        """id постов в порядке релевантности."""
+        posts = self.filter(Post.objects.order_by('-pub_date', '-pk'), query)
+        return list(
+            posts.values_list('pk', flat=True)[offset:offset + limit]
+        )
+
+    def search(self, query):
+        return SearchResults(self, query)
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    Инвертированный индекс на FTS5: в таблицу пишутся основы слов
+    (rowid = id поста), ранжирование — встроенный bm25.
+    """
+    table = 'posts_post_search'
+
+    def install(self, connection):
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} '
+                'USING fts5(stems)'
+            )
+
+    def uninstall(self, connection):
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def index(self, post_id, text):
+        self.index_many([(post_id, text)])
+
+    def index_many(self, rows):
+        rows = [(post_id, ' '.join(tokenize(text))) for post_id, text in rows]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(post_id,) for post_id, _ in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, stems) VALUES (%s, %s)',
+                rows,
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post_id]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def match(self, query):
+        """
+        Выражение MATCH: все основы запроса как префиксы. В основах
+        только буквы и цифры, поэтому кавычки не нужно экранировать.
+        """
+        return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+    def filter(self, queryset, query):
+        match = self.match(query)
+        if not match:
+            return queryset.none()
+        # RawSQL в pk__in оборачивается в лишние скобки, и SQLite
+        # считает подзапрос скалярным (только первая строка).
+        column = f'{queryset.model._meta.db_table}.{Post._meta.pk.column}'
+        return queryset.extra(
+            where=[
+                f'{column} IN (SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s)'
+            ],
+            params=[match],
+        )
+
+    def count(self, query):
+        match = self.match(query)
+        if not match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {self.table} '
+                f'WHERE {self.table} MATCH %s',
+                [match],
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, offset, limit):
+        match = self.match(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s '
+                'ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                [match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def get_backend():
+    return import_string(settings.POSTS_SEARCH_BACKEND)()
+
+
+@task
+def reindex_post(post_id):
+    """Приводит индекс к текущему тексту поста или убирает удаленный."""
+    text = Post.objects.filter(pk=post_id).values_list(
+        'text', flat=True
+    ).first()
+    if text is None:
+        get_backend().remove(post_id)
+    else:
+        get_backend().index(post_id, text)
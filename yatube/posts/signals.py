@@ -0,0 +1,191 @@
+from django.db.models import (DateTimeField, F, OuterRef, Subquery,
+                              Value)
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import following, search, timelines
+from .caching import (HOT_FEED, author_feed, bump_feeds, group_feed,
+                      post_feeds)
+from .models import Comment, Follow, Group, HotPost, Post, User, UserStats
+
+
+def actual_stats(user_id):
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def change_stats(user_id, field, delta):
+    if user_id is None:
+        return
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        # Счетчик, разъехавшийся до нуля, не уходит в минус (CHECK
+        # поля): его починит recount_posts.
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    updated = stats.update(**{field: F(field) + delta})
+    # Уменьшать нечего: строки нет, пока ее не создаст следующее
+    # увеличение, или пользователь удаляется каскадом и его счетчики
+    # уже удалены — тогда новая строка сломала бы внешний ключ.
+    if not updated and delta > 0:
+        UserStats.objects.get_or_create(
+            user_id=user_id, defaults=actual_stats(user_id)
+        )
+
+
+def change_author_posts(author_id, delta):
+    change_stats(author_id, 'posts_count', delta)
+
+
+def change_group_posts(group_id, delta):
+    if group_id is None:
+        return
+    Group.objects.filter(pk=group_id).update(
+        posts_count=F('posts_count') + delta
+    )
+
+
+def loaded_state(post):
+    """Автор и группа поста на момент чтения из базы."""
+    return (
+        getattr(post, '_loaded_author_id', post.author_id),
+        getattr(post, '_loaded_group_id', post.group_id),
+    )
+
+
+def hot_feeds(post_id):
+    """
+    Рейтинг «Популярного» меняет только hot.recompute, но текст
+    и счетчики поста из рейтинга видны и на его странице.
+    """
+    if HotPost.objects.filter(post_id=post_id).exists():
+        return [HOT_FEED]
+    return []
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_author_id, old_group_id = loaded_state(instance)
+    if created:
+        change_author_posts(instance.author_id, 1)
+        change_group_posts(instance.group_id, 1)
+        timelines.fan_out.delay(instance.pk)
+    else:
+        if old_author_id != instance.author_id:
+            change_author_posts(old_author_id, -1)
+            change_author_posts(instance.author_id, 1)
+        if old_group_id != instance.group_id:
+            change_group_posts(old_group_id, -1)
+            change_group_posts(instance.group_id, 1)
+    search.reindex_post.delay(instance.pk)
+    # Сбрасываем кеш только тех лент, где пост был или стал виден.
+    bump_feeds(
+        *post_feeds(instance.author_id, instance.group_id),
+        *post_feeds(old_author_id, old_group_id),
+        *([] if created else hot_feeds(instance.pk)),
+    )
+    instance.remember_state()
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # Строку рейтинга удалит каскад раньше, чем сработает post_delete.
+    instance._hot_feeds = hot_feeds(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    old_author_id, old_group_id = loaded_state(instance)
+    change_author_posts(old_author_id, -1)
+    change_group_posts(old_group_id, -1)
+    search.reindex_post.delay(instance.pk)
+    bump_feeds(
+        *post_feeds(old_author_id, old_group_id),
+        *getattr(instance, '_hot_feeds', ()),
+    )
+
+
+def commented_post(post_id):
+    return Post.objects.filter(pk=post_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    commented_post(instance.post_id).update(
+        comments_count=F('comments_count') + 1,
+        last_activity=Greatest(
+            'last_activity',
+            Value(instance.created, output_field=DateTimeField()),
+        ),
+    )
+    bump_comment_feeds(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # Последний комментарий находится по индексу (post, created, id)
+    # внутри того же UPDATE.
+    latest = Comment.objects.filter(post=OuterRef('pk')).order_by(
+        '-created', '-id'
+    ).values('created')[:1]
+    updated = commented_post(instance.post_id).update(
+        comments_count=F('comments_count') - 1,
+        last_activity=Coalesce(Subquery(latest), 'pub_date'),
+    )
+    # Пост удален вместе с комментариями: лентами займется post_deleted.
+    if updated:
+        bump_comment_feeds(instance.post_id)
+
+
+def bump_comment_feeds(post_id):
+    """Счетчик комментариев виден в лентах поста."""
+    post = commented_post(post_id).values('author_id', 'group_id').first()
+    if post is not None:
+        bump_feeds(
+            *post_feeds(post['author_id'], post['group_id']),
+            *hot_feeds(post_id),
+        )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    """Название и описание группы — часть ее страницы."""
+    if not created and not raw:
+        bump_feeds(group_feed(instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_stats(instance.author_id, 'followers_count', 1)
+        change_stats(instance.user_id, 'following_count', 1)
+        following.invalidate(instance.user_id)
+        bump_follow_feeds(instance)
+        timelines.backfill.delay(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_stats(instance.author_id, 'followers_count', -1)
+    change_stats(instance.user_id, 'following_count', -1)
+    following.invalidate(instance.user_id)
+    bump_follow_feeds(instance)
+    timelines.prune(instance.user_id, instance.author_id)
+
+
+def bump_follow_feeds(follow):
+    """Счетчики подписчиков и подписок видны в профилях обоих."""
+    bump_feeds(author_feed(follow.author_id), author_feed(follow.user_id))
@@ -0,0 +1,14 @@
+from django import template
+
+from .. import paginators
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def page_query(context, query='', **params):
+    """
+    Параметры ссылки на другую страницу: page/cursor заменяются,
+    остальные параметры запроса (?sort=, ?q=) сохраняются.
+    """
+    return paginators.page_query(context['request'].GET, query, **params)
@@ -0,0 +1,11 @@
+from django import template
+
+from ..thumbnails import ready_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, size='feed'):
+    """Готовая миниатюра или None, пока воркер ее не создал."""
+    return ready_thumbnail(image, size)
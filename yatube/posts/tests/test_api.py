@@ -0,0 +1,140 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..views import num_of_pub
+from .test_views import (DESCRIPTION, FIRST_TITLE, SLUG, TEXT_ONE, TEXT_TWO,
+                         USER_ONE, USER_TWO)
+
+User = get_user_model()
+
+
+# python3 manage.py test posts.tests.test_api для запуска тестов
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_ONE)
+        cls.reader = User.objects.create_user(username=USER_TWO)
+        cls.group = Group.objects.create(
+            title=FIRST_TITLE, slug=SLUG, description=DESCRIPTION
+        )
+        for _ in range(num_of_pub + 3):
+            Post.objects.create(
+                text=TEXT_ONE, author=cls.author, group=cls.group
+            )
+        cls.post = Post.objects.create(text=TEXT_TWO, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_walk_by_cursor(self):
+        """Ленты API листаются курсором и отдают только нужные поля."""
+        feeds = {
+            reverse('posts:api_index'): Post.objects.all(),
+            reverse('posts:api_group', args=(SLUG,)): self.group.posts.all(),
+            reverse('posts:api_profile', args=(USER_ONE,)):
+                self.author.posts.all(),
+        }
+        for url, posts in feeds.items():
+            with self.subTest(url=url):
+                seen = []
+                while url:
+                    data = self.client.get(url).json()
+                    seen += [post['id'] for post in data['results']]
+                    url = data['next']
+                self.assertEqual(
+                    seen, list(posts.values_list('pk', flat=True))
+                )
+        post = self.client.get(reverse('posts:api_index')).json()['results'][0]
+        self.assertEqual(post, {
+            'id': self.post.pk,
+            'text': TEXT_TWO,
+            'pub_date': post['pub_date'],
+            'author': USER_ONE,
+            'group': None,
+            'image': None,
+            'comments_count': 0,
+        })
+
+    def test_unchanged_feed_returns_304(self):
+        """Неизменившаяся лента отвечает 304, новая запись сбрасывает."""
+        url = reverse('posts:api_index')
+        response = self.client.get(url)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text=TEXT_ONE, author=self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_validators_follow_comments(self):
+        """ETag поста меняется с новым комментарием."""
+        url = reverse('posts:api_post', args=(self.post.pk,))
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text=TEXT_ONE)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['post']['comments_count'], 1)
+        self.assertEqual(data['comments']['results'][0]['author'], USER_TWO)
+
+    def test_follow_feed(self):
+        """Лента подписок требует входа и меняет ETag после подписки."""
+        url = reverse('posts:api_follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        response = self.reader_client.get(url)
+        self.assertEqual(response.json()['results'], [])
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), num_of_pub)
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_follow_etag_tracks_followed_posts(self):
+        """
+        ETag ленты подписок меняется с правкой поста и комментарием
+        и не пересчитывает ленту по базе.
+        """
+        Follow.objects.create(user=self.reader, author=self.author)
+        url = reverse('posts:api_follow')
+        etag = self.reader_client.get(url)['ETag']
+        with self.assertNumQueries(2):
+            response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.post.text = TEXT_ONE
+        self.post.save()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.reader, text=TEXT_TWO
+        )
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_objects_return_404(self):
+        """Несуществующие группа, автор и пост дают 404."""
+        urls = (
+            reverse('posts:api_group', args=('missing',)),
+            reverse('posts:api_profile', args=('missing',)),
+            reverse('posts:api_post', args=(0,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
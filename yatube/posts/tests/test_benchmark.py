@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+from ..management.commands.seed_benchmark import READER_PREFIX
+from ..paginators import SHALLOW_PAGES
+
+
+# python3 manage.py test posts.tests.test_benchmark для запуска тестов
+class BenchmarkCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed_benchmark', users=30, readers=3, groups=3, posts=60,
+            comments=90, follows=5, stdout=StringIO(),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_creates_consistent_dataset(self):
+        """Набор данных нужного размера, счетчики и ленты сходятся."""
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 90)
+        self.assertEqual(Follow.objects.count(), 30 * 5)
+        out = StringIO()
+        call_command('recount_posts', dry_run=True, stdout=out)
+        self.assertIn('групп — 0, авторов — 0, постов — 0', out.getvalue())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user__username__startswith=READER_PREFIX
+        ).exists())
+
+    def test_benchmark_writes_json(self):
+        """Замер проходит по всем сценариям и пишет JSON."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'benchmark.json')
+            call_command(
+                'benchmark_views', requests=3, warmup=1, pages=[2],
+                cursor_depth=1, output=path, label='test',
+                stdout=StringIO(),
+            )
+            with open(path, encoding='utf-8') as stream:
+                data = json.load(stream)
+        self.assertEqual(data['label'], 'test')
+        self.assertEqual(data['dataset']['post'], 60)
+        self.assertEqual(set(data['scenarios']), {
+            'index', 'index_page_2', 'index_cursor', 'group_posts',
+            'profile', 'post_detail', 'follow_index',
+        })
+        for name, result in data['scenarios'].items():
+            with self.subTest(scenario=name):
+                self.assertEqual(result['statuses'], {'200': 3})
+                self.assertEqual(
+                    set(result['latency_ms']),
+                    {'mean', 'p50', 'p90', 'p99', 'max'},
+                )
+
+    def test_deep_page_numbers_are_rejected(self):
+        """Глубина меряется курсором, а не номером страницы."""
+        with self.assertRaises(CommandError):
+            call_command(
+                'benchmark_views', requests=1, pages=[SHALLOW_PAGES + 1],
+                stdout=StringIO(),
+            )
+
+
+class ConcurrentBenchmarkTests(TransactionTestCase):
+    """Потоки замера читают базу своими соединениями: данные закоммичены."""
+
+    def test_concurrent_benchmark(self):
+        """С --concurrency запросы идут из нескольких потоков сразу."""
+        cache.clear()
+        call_command(
+            'seed_benchmark', users=10, readers=2, groups=2, posts=20,
+            comments=20, follows=2, skip_search_index=True,
+            stdout=StringIO(),
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'benchmark.json')
+            call_command(
+                'benchmark_views', requests=4, warmup=1, pages=[2],
+                cursor_depth=1, concurrency=2, output=path,
+                stdout=StringIO(),
+            )
+            with open(path, encoding='utf-8') as stream:
+                data = json.load(stream)
+        self.assertEqual(data['concurrency'], 2)
+        for name, result in data['scenarios'].items():
+            with self.subTest(scenario=name):
+                self.assertEqual(result['statuses'], {'200': 4})
@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..conditional import PUBLIC_MAX_AGE
+from ..models import Comment, Follow, Group, Post
+from .test_views import (DESCRIPTION, FIRST_TITLE, SLUG, TEXT_ONE, USER_ONE,
+                         USER_TWO)
+
+User = get_user_model()
+PASSWORD = 'Secret-password-1'
+
+
+# python3 manage.py test posts.tests.test_conditional для запуска тестов
+class ConditionalPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_ONE)
+        cls.reader = User.objects.create_user(
+            username=USER_TWO, password=PASSWORD
+        )
+        cls.group = Group.objects.create(
+            title=FIRST_TITLE, slug=SLUG, description=DESCRIPTION
+        )
+        cls.post = Post.objects.create(
+            text=TEXT_ONE, author=cls.author, group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:group_list', args=(SLUG,)),
+            reverse('posts:profile', args=(USER_ONE,)),
+            reverse('posts:post_detail', args=(cls.post.pk,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_anonymous_pages_are_public(self):
+        """Анонимные страницы общие для прокси и отвечают 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn(
+                    f'max-age={PUBLIC_MAX_AGE}', response['Cache-Control']
+                )
+                self.assertIn('Cookie', response['Vary'])
+                self.assertTrue(response.has_header('Last-Modified'))
+                repeat = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(repeat.status_code, 304)
+                self.assertIn('public', repeat['Cache-Control'])
+                repeat = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(repeat.status_code, 304)
+
+    def test_user_pages_are_private(self):
+        """Страница пользователя своя: приватна и не совпадает с чужой."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                anonymous = self.client.get(url)
+                response = self.reader_client.get(url)
+                self.assertIn('private', response['Cache-Control'])
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertFalse(response.has_header('Last-Modified'))
+                self.assertNotEqual(response['ETag'], anonymous['ETag'])
+                repeat = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=anonymous['ETag']
+                )
+                self.assertEqual(repeat.status_code, 200)
+                repeat = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(repeat.status_code, 304)
+
+    def test_changes_reset_validators(self):
+        """Подписка, комментарий и правка группы меняют ETag страниц."""
+        changes = {
+            self.urls[0]: lambda: Group.objects.filter(pk=self.group.pk)
+            .first().save(),
+            self.urls[1]: lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            ),
+            self.urls[2]: lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text=TEXT_ONE
+            ),
+        }
+        for url, change in changes.items():
+            with self.subTest(url=url):
+                etag = self.reader_client.get(url)['ETag']
+                change()
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_new_csrf_token_resets_post_validators(self):
+        """После повторного входа страница с формой не отдается 304."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        etag = self.reader_client.get(url)['ETag']
+        self.assertEqual(
+            self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            304,
+        )
+        self.reader_client.get(reverse('users:logout'))
+        self.reader_client.post(
+            reverse('users:login'),
+            {'username': USER_TWO, 'password': PASSWORD},
+        )
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_pages_are_not_cached(self):
+        """404 уходит без валидаторов и Cache-Control."""
+        urls = (
+            reverse('posts:group_list', args=('missing',)),
+            reverse('posts:profile', args=('missing',)),
+            reverse('posts:post_detail', args=(self.post.pk + 100,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertFalse(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Cache-Control'))
@@ -0,0 +1,265 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..caching import author_feed, feed_cache_key, group_feed
+from ..models import (Comment, Follow, Group, Post, TimelineEntry,
+                      UserStats)
+from .test_views import (DESCRIPTION, FIRST_TITLE, SECOND_SLUG, SECOND_TITLE,
+                         SLUG, TEXT_ONE, TEXT_TWO, USER_ONE)
+
+User = get_user_model()
+
+
+# python3 manage.py test posts.tests.test_counters для запуска тестов
+class PostCountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_ONE)
+        cls.group = Group.objects.create(
+            title=FIRST_TITLE,
+            slug=SLUG,
+            description=DESCRIPTION,
+        )
+        cls.second_group = Group.objects.create(
+            title=SECOND_TITLE,
+            slug=SECOND_SLUG,
+            description=DESCRIPTION,
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def assertCounters(self, author, group, second_group):
+        self.user.stats.refresh_from_db()
+        self.group.refresh_from_db()
+        self.second_group.refresh_from_db()
+        self.assertEqual(self.user.stats.posts_count, author)
+        self.assertEqual(self.group.posts_count, group)
+        self.assertEqual(self.second_group.posts_count, second_group)
+
+    def test_counters_follow_post_lifecycle(self):
+        """Счетчики меняются при создании, смене группы и удалении."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': TEXT_ONE, 'group': self.group.pk},
+        )
+        self.assertCounters(1, 1, 0)
+        post = Post.objects.get()
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            data={'text': TEXT_TWO, 'group': self.second_group.pk},
+        )
+        self.assertCounters(1, 0, 1)
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            data={'text': TEXT_TWO},
+        )
+        self.assertCounters(1, 0, 0)
+        Post.objects.get().delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_recount_command_repairs_drift(self):
+        """Команда recount_posts чинит разъехавшиеся счетчики."""
+        Post.objects.bulk_create(
+            Post(text=TEXT_ONE, author=self.user, group=self.group)
+            for _ in range(3)
+        )
+        UserStats.objects.filter(user=self.user).delete()
+        feeds = (author_feed(self.user.pk), group_feed(self.group.pk))
+        before = [feed_cache_key(feed) for feed in feeds]
+        call_command('recount_posts', stdout=StringIO())
+        self.user = User.objects.get(pk=self.user.pk)
+        self.assertCounters(3, 3, 0)
+        # Исправленные счетчики видны в лентах без ожидания кеша.
+        for feed, key in zip(feeds, before):
+            self.assertNotEqual(feed_cache_key(feed), key)
+
+    def test_user_delete_cascades_with_counters(self):
+        """
+        Пользователь с постами, комментариями и подписками в обе
+        стороны удаляется целиком.
+        """
+        author = User.objects.create_user(username='leaving')
+        post = Post.objects.create(
+            text=TEXT_ONE, author=author, group=self.group
+        )
+        Comment.objects.create(post=post, author=author, text=TEXT_TWO)
+        Comment.objects.create(post=post, author=self.user, text=TEXT_TWO)
+        Follow.objects.create(user=author, author=self.user)
+        Follow.objects.create(user=self.user, author=author)
+        author.delete()
+        self.assertFalse(UserStats.objects.filter(user_id=author.pk).exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertCounters(0, 0, 0)
+        self.assertEqual(
+            (self.user.stats.followers_count, self.user.stats.following_count),
+            (0, 0),
+        )
+
+
+class CommentCountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_ONE)
+        cls.quiet = Post.objects.create(text=TEXT_ONE, author=cls.user)
+        cls.post = Post.objects.create(text=TEXT_TWO, author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def comment(self, post):
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            data={'text': TEXT_ONE},
+        )
+
+    def test_counters_follow_comment_lifecycle(self):
+        """Счетчик и последняя активность меняются вместе с комментариями."""
+        self.comment(self.post)
+        self.comment(self.post)
+        self.post.refresh_from_db()
+        first, last = Comment.objects.order_by('created')
+        self.assertEqual(self.post.comments_count, 2)
+        self.assertEqual(self.post.last_activity, last.created)
+        last.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.post.last_activity, first.created)
+        first.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.post.last_activity, self.post.pub_date)
+
+    def test_post_edit_keeps_counters(self):
+        """Сохранение устаревшего экземпляра не затирает счетчики."""
+        stale = Post.objects.get(pk=self.post.pk)
+        self.comment(self.post)
+        stale.text = TEXT_ONE
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.post.text, TEXT_ONE)
+
+    def test_feeds_sort_by_activity(self):
+        """?sort=activity поднимает обсуждаемые посты наверх ленты."""
+        self.comment(self.quiet)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                newest = self.client.get(url).context['page_obj']
+                active = self.client.get(
+                    url, {'sort': 'activity'}
+                ).context['page_obj']
+                self.assertEqual(newest[0], self.post)
+                self.assertEqual(active[0], self.quiet)
+                self.assertEqual(active[0].comments_count, 1)
+
+    def test_recount_command_repairs_comment_counters(self):
+        """recount_posts чинит счетчики комментариев постов."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=TEXT_ONE)
+            for _ in range(3)
+        )
+        call_command('recount_posts', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+        self.assertLess(timezone.now() - self.post.last_activity,
+                        timezone.timedelta(minutes=1))
+        self.assertGreater(self.post.last_activity, self.post.pub_date)
+
+
+class FollowCountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_ONE)
+        cls.readers = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.readers[0])
+
+    def assertFollowCounters(self, user, followers, following):
+        stats = UserStats.objects.get(user=user)
+        self.assertEqual(
+            (stats.followers_count, stats.following_count),
+            (followers, following),
+        )
+
+    def test_counters_follow_subscriptions(self):
+        """Подписка и отписка меняют счетчики обоих пользователей."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(USER_ONE,))
+        )
+        self.assertFollowCounters(self.author, 1, 0)
+        self.assertFollowCounters(self.readers[0], 0, 1)
+        response = self.client.get(reverse('posts:profile', args=(USER_ONE,)))
+        self.assertEqual(response.context['stats'].followers_count, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=(USER_ONE,))
+        )
+        self.assertFollowCounters(self.author, 0, 0)
+        self.assertFollowCounters(self.readers[0], 0, 0)
+
+    def test_decrement_stops_at_zero(self):
+        """Отписка при разъехавшемся нулевом счетчике не уходит в минус."""
+        Follow.objects.create(user=self.readers[0], author=self.author)
+        UserStats.objects.update(followers_count=0, following_count=0)
+        Follow.objects.get().delete()
+        self.assertFollowCounters(self.author, 0, 0)
+        self.assertFollowCounters(self.readers[0], 0, 0)
+
+    def test_recount_command_repairs_following(self):
+        """recount_posts чинит счетчик подписок."""
+        Follow.objects.bulk_create(
+            Follow(user=self.readers[0], author=author)
+            for author in [self.author, *self.readers[1:]]
+        )
+        call_command('recount_posts', stdout=StringIO())
+        self.assertFollowCounters(self.readers[0], 0, 5)
+        self.assertFollowCounters(self.author, 1, 0)
+
+    def test_follow_lists_walk_by_cursor(self):
+        """Списки подписчиков листаются по курсору, новые сверху."""
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.author)
+        url = reverse('posts:profile_followers', args=(USER_ONE,))
+        seen = []
+        with mock.patch('posts.views.follows_per_page', 2):
+            response = self.client.get(url)
+            while True:
+                seen.extend(response.context['people'])
+                self.assertEqual(response.context['page_obj'].paginator.count,
+                                 len(self.readers))
+                if not response.context['page_obj'].has_next():
+                    break
+                response = self.client.get(
+                    url + '?' + response.context['page_obj'].next_query
+                )
+        self.assertEqual(seen, self.readers[::-1])
+        self.assertContains(
+            response, 'aria-label="Page navigation"', count=1
+        )
+        response = self.reader_client.get(
+            reverse('posts:profile_following', args=(self.readers[0],))
+        )
+        self.assertEqual(response.context['people'], [self.author])
@@ -13,6 +13,14 @@ from .test_views import DESCRIPTION, FIRST_TITLE, SLUG, TEXT_ONE, \
     USER_ONE, USER_TWO
 
 User = get_user_model()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
@@ -163,6 +171,35 @@ class PostCreateFormTests(TestCase):
             comments_count + 1,
         )
 
+    def assert_upload_rejected(self, uploaded):
+        posts_count = Post.objects.count()
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Текст поста', 'image': uploaded},
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['form'].has_error('image'))
+        self.assertEqual(Post.objects.count(), posts_count)
+
+    def test_upload_rejected_early(self):
+        """Слишком большие и неподходящие файлы отвергаются при загрузке"""
+        cases = {
+            'bytes': override_settings(POSTS_UPLOAD_MAX_BYTES=10),
+            'pixels': override_settings(POSTS_UPLOAD_MAX_PIXELS=1),
+        }
+        for limit, settings_override in cases.items():
+            with self.subTest(limit=limit), settings_override:
+                self.assert_upload_rejected(SimpleUploadedFile(
+                    name='small.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif'
+                ))
+        self.assert_upload_rejected(SimpleUploadedFile(
+            name='fake.gif',
+            content=b'GIF? no, just text',
+            content_type='image/gif'
+        ))
+
     # def test_new_post_appears_in_the_feed(self):
     #     """
     #         Новая запись пользователя появляется в ленте тех, кто на него подписан
@@ -0,0 +1,112 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..hot import HOT_WINDOW, hot_score, recompute
+from ..models import Comment, Follow, HotPost, Post
+from ..views import num_of_pub
+from .test_views import TEXT_ONE, TEXT_TWO, USER_ONE, USER_TWO
+
+User = get_user_model()
+NEW_TEXT = 'Исправленный пост'
+
+
+# python3 manage.py test posts.tests.test_hot для запуска тестов
+class HotPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_ONE)
+        cls.reader = User.objects.create_user(username=USER_TWO)
+        cls.older = Post.objects.create(text=TEXT_ONE, author=cls.author)
+        cls.newer = Post.objects.create(text=TEXT_TWO, author=cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def hot_ids(self):
+        return list(
+            HotPost.objects.order_by('-score').values_list('post', flat=True)
+        )
+
+    def test_score_decays_with_time(self):
+        """Свежий пост выше старого с той же вовлеченностью."""
+        now = timezone.now()
+        self.assertGreater(
+            hot_score(10, now), hot_score(10, now - datetime.timedelta(1))
+        )
+        self.assertGreater(hot_score(10, now), hot_score(1, now))
+
+    def test_comments_and_follows_raise_post(self):
+        """Комментарии и новые подписчики автора поднимают пост."""
+        recompute()
+        self.assertEqual(self.hot_ids(), [self.newer.pk, self.older.pk])
+        Comment.objects.create(
+            post=self.older, author=self.reader, text=TEXT_TWO
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(recompute(), 1)
+        self.assertEqual(self.hot_ids(), [self.older.pk, self.newer.pk])
+
+    def test_only_touched_posts_are_recomputed(self):
+        """Повторный пересчет трогает только посты с новой активностью."""
+        self.assertEqual(recompute(), 2)
+        self.assertEqual(recompute(), 0)
+        Comment.objects.create(
+            post=self.newer, author=self.author, text=TEXT_ONE
+        )
+        self.assertEqual(recompute(), 1)
+        self.assertEqual(recompute(full=True), 2)
+
+    def test_old_posts_leave_ranking(self):
+        """Посты старше окна выпадают из рейтинга."""
+        recompute()
+        Post.objects.filter(pk=self.older.pk).update(
+            pub_date=timezone.now() - HOT_WINDOW * 2
+        )
+        recompute()
+        self.assertEqual(self.hot_ids(), [self.newer.pk])
+
+    def test_post_changes_reset_hot_page(self):
+        """Правка, комментарий и удаление поста видны на /hot/ сразу."""
+        recompute()
+        url = reverse('posts:hot')
+        self.assertContains(self.client.get(url), TEXT_TWO)
+        post = Post.objects.get(pk=self.newer.pk)
+        post.text = NEW_TEXT
+        post.save()
+        self.assertContains(self.client.get(url), NEW_TEXT)
+        Comment.objects.create(post=post, author=self.author, text=TEXT_ONE)
+        page_obj = self.client.get(url).context['page_obj']
+        self.assertEqual(page_obj[0].comments_count, 1)
+        post.delete()
+        self.assertNotContains(self.client.get(url), NEW_TEXT)
+
+    def test_hot_page_reads_ranking(self):
+        """Страница читает готовый рейтинг и листается курсором."""
+        Post.objects.bulk_create(
+            Post(text=TEXT_ONE, author=self.author)
+            for _ in range(num_of_pub * 6)
+        )
+        call_command('rank_hot_posts', stdout=StringIO())
+        url = reverse('posts:hot')
+        response = self.client.get(url, {'page': 5})
+        page_obj = response.context['page_obj']
+        ids = self.hot_ids()
+        self.assertEqual(
+            [post.pk for post in page_obj],
+            ids[num_of_pub * 4:num_of_pub * 5],
+        )
+        # Только страница рейтинга: пагинатор обходится без COUNT(*).
+        with self.assertNumQueries(1):
+            response = self.client.get(url + f'?{page_obj.next_query}')
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            ids[num_of_pub * 5:num_of_pub * 6],
+        )
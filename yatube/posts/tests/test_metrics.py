@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.testing import QueryBudgetMixin
+from ..models import Comment, Follow, Group, Post
+from ..views import num_of_pub
+from .test_views import (DESCRIPTION, FIRST_TITLE, SLUG, TEXT_ONE, USER_ONE,
+                         USER_TWO)
+
+User = get_user_model()
+
+
+# python3 manage.py test posts.tests.test_metrics для запуска тестов
+class RequestMetricsTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_ONE)
+        cls.reader = User.objects.create_user(username=USER_TWO)
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title=FIRST_TITLE, slug=SLUG, description=DESCRIPTION
+        )
+        for _ in range(num_of_pub + 3):
+            cls.post = Post.objects.create(
+                text=TEXT_ONE, author=cls.author, group=cls.group
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=TEXT_ONE
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_views_within_query_budget(self):
+        """Ленты укладываются в бюджеты SQL-запросов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:hot'),
+            reverse('posts:group_list', args=(SLUG,)),
+            reverse('posts:profile', args=(USER_ONE,)),
+            reverse('posts:profile_followers', args=(USER_ONE,)),
+            reverse('posts:profile_following', args=(USER_ONE,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:post_comments', args=(self.post.pk,)),
+            reverse('posts:search') + f'?q={TEXT_ONE}',
+            reverse('posts:follow_index'),
+            reverse('posts:api_index'),
+            reverse('posts:api_group', args=(SLUG,)),
+            reverse('posts:api_profile', args=(USER_ONE,)),
+            reverse('posts:api_post', args=(self.post.pk,)),
+            reverse('posts:api_follow'),
+        )
+        for client in (self.client, self.reader_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    cache.clear()
+                    self.assertWithinQueryBudget(client.get(url))
+
+    def test_request_metrics(self):
+        """Замер запроса: SQL считается, шаблоны только у HTML."""
+        page = self.reader_client.get(reverse('posts:index')).metrics
+        self.assertGreater(page.queries, 0)
+        self.assertGreater(page.sql_time, 0)
+        self.assertGreater(page.template_time, 0)
+        self.assertGreaterEqual(
+            page.total_time, page.sql_time + page.template_time
+        )
+        api = self.client.get(reverse('posts:api_index')).metrics
+        self.assertEqual(api.template_time, 0)
+
+    @override_settings(QUERY_BUDGETS={'posts:index': 0})
+    def test_report_counts_over_budget(self):
+        """Отчет считает замеры сверх бюджета."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(metrics.report()['posts:index']['over_budget'], 1)
+
+    def test_report_is_staff_only(self):
+        """Отчет с процентилями видит только staff."""
+        for _ in range(3):
+            self.client.get(reverse('posts:index'))
+        response = self.reader_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+        report = self.staff_client.get(reverse('metrics')).json()
+        self.assertEqual(report['posts:index']['count'], 3)
+        self.assertEqual(
+            set(report['posts:index']),
+            {'count', 'query_budget', 'over_budget', *metrics.FIELDS},
+        )
+        self.assertEqual(
+            set(report['posts:index']['total_ms']), {'p50', 'p95', 'p99'}
+        )
@@ -1,8 +1,15 @@
+import datetime
+from importlib import import_module
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, skipUnlessDBFeature
+from django.utils import timezone
 
-from ..models import NUM_OF_WORDS, Group, Post
-from .test_views import DESCRIPTION, FIRST_TITLE, SLUG, TEXT_ONE, USER_ONE
+from ..models import NUM_OF_WORDS, Follow, Group, Post
+from ..paginators import FEED_ORDERING
+from .test_views import (DESCRIPTION, FIRST_TITLE, SLUG, TEXT_ONE, USER_ONE,
+                         USER_TWO)
 
 User = get_user_model()
 
@@ -59,3 +66,64 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     group._meta.get_field(field).verbose_name, expected_value)
+
+
+class FeedIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_ONE)
+        cls.second_user = User.objects.create_user(username=USER_TWO)
+        cls.group = Group.objects.create(
+            title=FIRST_TITLE,
+            slug=SLUG,
+            description=DESCRIPTION,
+        )
+
+    @skipUnlessDBFeature('supports_explaining_query_execution')
+    def test_feeds_use_composite_indexes(self):
+        """Ленты читаются по составным индексам без сортировки."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Проверяется план SQLite')
+        feeds = {
+            'post_pub_date_idx': Post.objects.all(),
+            'post_group_pub_date_idx': Post.objects.filter(group=self.group),
+            'post_author_pub_date_idx': Post.objects.filter(author=self.user),
+        }
+        for index, queryset in feeds.items():
+            with self.subTest(index=index):
+                plan = queryset.order_by(*FEED_ORDERING)[:10].explain()
+                self.assertIn(index, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_is_unique(self):
+        """Повторная подписка и подписка на себя запрещены в базе."""
+        Follow.objects.create(user=self.user, author=self.second_user)
+        duplicates = (
+            {'user': self.user, 'author': self.second_user},
+            {'user': self.user, 'author': self.user},
+        )
+        for fields in duplicates:
+            with self.subTest(fields=fields):
+                with self.assertRaises(IntegrityError):
+                    with transaction.atomic():
+                        Follow.objects.create(**fields)
+
+
+class CommentCreatedMigrationTest(SimpleTestCase):
+    def test_dates_follow_comment_order(self):
+        """Если время суток идет назад, комментарий — на следующий день."""
+        migration = import_module(
+            'posts.migrations.0014_comment_created_datetime'
+        )
+        pub_date = datetime.datetime(2021, 5, 1, 22, 0, tzinfo=timezone.utc)
+        times = [datetime.time(hour) for hour in (23, 1, 1, 0, 23)]
+        days = [
+            created.day
+            for created in migration.created_datetimes(pub_date, times)
+        ]
+        self.assertEqual(days, [1, 2, 2, 3, 3])
+        first = next(
+            migration.created_datetimes(pub_date, [datetime.time(21)])
+        )
+        self.assertEqual(first.date(), datetime.date(2021, 5, 2))
@@ -0,0 +1,196 @@
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..feeds import index_posts_count
+from ..models import Post
+from ..paginators import (AFTER, LAST, SHALLOW_PAGES, CursorPaginator,
+                          encode_cursor)
+from ..views import num_of_pub
+from .test_views import TEXT_ONE, USER_ONE
+
+User = get_user_model()
+POSTS_COUNT = num_of_pub * (SHALLOW_PAGES + 2) + 3
+
+
+# python3 manage.py test posts.tests.test_paginators для запуска тестов
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_ONE)
+        Post.objects.bulk_create(
+            Post(text=f'{TEXT_ONE} {number}', author=cls.user)
+            for number in range(POSTS_COUNT)
+        )
+        # bulk_create ставит почти одинаковое время: порядок задает pk
+        cls.expected = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def paginator(self):
+        return CursorPaginator(Post.objects.all(), num_of_pub)
+
+    def test_shallow_pages_are_numbered(self):
+        """Первые страницы доступны по номеру."""
+        page = self.paginator().get_page(2)
+        self.assertFalse(page.is_cursor)
+        self.assertEqual(
+            list(page), self.expected[num_of_pub:num_of_pub * 2]
+        )
+        self.assertEqual(page.next_query, 'page=3')
+
+    def test_deep_page_number_opens_end_of_feed(self):
+        """
+        Номер глубже неглубокого окна не уходит в OFFSET и не подменяется
+        другой страницей: открывается конец ленты по курсору.
+        """
+        page = self.paginator().get_page(SHALLOW_PAGES + 2)
+        self.assertIsNone(page.number)
+        self.assertEqual(page.cache_key, LAST)
+        self.assertEqual(list(page), self.expected[-num_of_pub:])
+        self.assertFalse(page.has_next())
+
+    def test_cursor_walks_whole_feed(self):
+        """Курсором лента проходится целиком без пропусков и повторов."""
+        page = self.paginator().get_page(SHALLOW_PAGES)
+        seen = list(self.expected[:num_of_pub * (SHALLOW_PAGES - 1)])
+        seen += list(page)
+        while page.has_next():
+            self.assertTrue(page.next_query.startswith('cursor='))
+            page = self.paginator().get_page(cursor=page.next_cursor)
+            self.assertTrue(page.is_cursor)
+            seen += list(page)
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает предыдущую страницу."""
+        first = self.paginator().get_page(SHALLOW_PAGES)
+        second = self.paginator().get_page(cursor=first.next_cursor)
+        back = self.paginator().get_page(cursor=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+
+    def test_cursor_page_runs_single_query(self):
+        """Страница по курсору — один запрос без COUNT."""
+        page = self.paginator().get_page(SHALLOW_PAGES)
+        cursor = page.next_cursor
+        with self.assertNumQueries(1):
+            page = self.paginator().get_page(cursor=cursor)
+            page.has_next()
+            list(page)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        for cursor in (
+            'garbage',
+            encode_cursor('x', [1, 2]),
+            # Курсор разбирается, но значения не того типа.
+            encode_cursor(AFTER, [None, None]),
+            encode_cursor(AFTER, ['x', 'y']),
+            encode_cursor(AFTER, [[1], {'pk': 1}]),
+        ):
+            with self.subTest(cursor=cursor):
+                page = self.paginator().get_page(cursor=cursor)
+                self.assertEqual(page.number, 1)
+
+    def test_views_ignore_tampered_cursors(self):
+        """Подделанный курсор в любой ленте дает первую страницу, а не 500."""
+        post = self.expected[0]
+        reader = User.objects.create_user(username='reader')
+        self.client.force_login(reader)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:hot'),
+            reverse('posts:profile', args=(USER_ONE,)),
+            reverse('posts:profile_followers', args=(USER_ONE,)),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=(post.pk,)),
+            reverse('posts:post_comments', args=(post.pk,)),
+            reverse('posts:api_index'),
+            reverse('posts:api_profile', args=(USER_ONE,)),
+            reverse('posts:api_post', args=(post.pk,)),
+            reverse('posts:api_follow'),
+        )
+        for values in ([None, None], ['x', 'y'], [None]):
+            cursor = encode_cursor(AFTER, values)
+            for url in urls:
+                with self.subTest(url=url, values=values):
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, 200)
+
+    def test_numbered_page_runs_without_count(self):
+        """Страница по номеру — один запрос без COUNT, с лишней строкой."""
+        with self.assertNumQueries(1):
+            page = self.paginator().get_page(2)
+            self.assertTrue(page.has_next())
+            self.assertEqual(list(page.page_window), [1, 2, 3])
+            self.assertEqual(page.last_query, f'cursor={LAST}')
+
+    def test_page_window_is_bounded(self):
+        """Ссылок на номера страниц не больше окна вокруг текущей."""
+        paginator = CursorPaginator(
+            Post.objects.all(), 1, shallow_pages=POSTS_COUNT,
+            count=POSTS_COUNT,
+        )
+        page = paginator.get_page(10)
+        self.assertEqual(list(page.page_window), [8, 9, 10, 11, 12])
+        self.assertEqual(page.last_query, f'page={POSTS_COUNT}')
+        page = paginator.get_page(POSTS_COUNT)
+        self.assertFalse(page.has_next())
+        self.assertEqual(
+            list(page.page_window), [POSTS_COUNT - 2, POSTS_COUNT - 1,
+                                     POSTS_COUNT]
+        )
+
+    def test_last_cursor_opens_end_of_feed(self):
+        """Курсор конца ленты открывает последние посты."""
+        page = self.paginator().get_page(cursor=LAST)
+        self.assertTrue(page.is_cursor)
+        self.assertFalse(page.has_next())
+        self.assertEqual(list(page), self.expected[-num_of_pub:])
+        back = self.paginator().get_page(cursor=page.previous_cursor)
+        self.assertEqual(
+            list(back), self.expected[-num_of_pub * 2:-num_of_pub]
+        )
+
+    def test_page_past_the_end_opens_end_of_feed(self):
+        """Номер за концом короткой ленты ведет на ее конец."""
+        paginator = CursorPaginator(
+            Post.objects.filter(pk__in=[post.pk for post in
+                                        self.expected[:num_of_pub + 3]]),
+            num_of_pub,
+        )
+        page = paginator.get_page(SHALLOW_PAGES)
+        self.assertEqual(list(page), self.expected[3:num_of_pub + 3])
+        self.assertFalse(page.has_next())
+
+    def test_index_count_is_cached_and_refreshed(self):
+        """Число постов главной берется из кеша и пересчитывается позже."""
+        # bulk_create в setUpClass обходит сигналы счетчиков
+        call_command('recount_posts', stdout=StringIO())
+        cache.clear()
+        self.assertEqual(index_posts_count(), POSTS_COUNT)
+        Post.objects.create(text=TEXT_ONE, author=self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(index_posts_count(), POSTS_COUNT)
+        later = time.time() + 60 * 60
+        with mock.patch('posts.caching.COUNT_REFRESH_WORKERS', 0), \
+                mock.patch('posts.caching.time.time', return_value=later):
+            self.assertEqual(index_posts_count(), POSTS_COUNT)
+            self.assertEqual(index_posts_count(), POSTS_COUNT + 1)
+
+    def test_index_accepts_cursor(self):
+        """Главная страница листается по курсору."""
+        page = self.paginator().get_page(SHALLOW_PAGES)
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': page.next_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            self.expected[num_of_pub * SHALLOW_PAGES:
+                          num_of_pub * (SHALLOW_PAGES + 1)]
+        )
@@ -0,0 +1,113 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.routers import ReplicaPinMiddleware
+from ..models import Post
+from .test_views import TEXT_ONE, TEXT_TWO, USER_ONE, USER_TWO
+
+User = get_user_model()
+
+REPLICA = 'replica'
+
+
+# python3 manage.py test posts.tests.test_replicas для запуска тестов
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Основная база и реплика — две отдельные базы SQLite. Снимок
+    делается из закоммиченных данных, поэтому без транзакций TestCase.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica_dir = tempfile.mkdtemp()
+        connections.databases[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.replica_dir, 'replica.sqlite3'),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        os.remove(os.path.join(cls.replica_dir, 'replica.sqlite3'))
+        os.rmdir(cls.replica_dir)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username=USER_ONE)
+        self.reader = User.objects.create_user(username=USER_TWO)
+        self.post = Post.objects.create(text=TEXT_ONE, author=self.author)
+        self.replicate()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def replicate(self):
+        """Снимок основной базы в файл реплики — «репликация»."""
+        replica = connections[REPLICA]
+        replica.ensure_connection()
+        connections['default'].connection.backup(replica.connection)
+
+    def test_feeds_read_from_replica(self):
+        """Ленты читаются с реплики, запись идет в основную базу."""
+        Post.objects.filter(pk=self.post.pk).update(text=TEXT_TWO)
+        # Поколения лент старше отставания реплики: ей можно верить.
+        with self.settings(DATABASE_PIN_SECONDS=0):
+            for url in (
+                reverse('posts:index'),
+                reverse('posts:profile', args=(USER_ONE,)),
+                reverse('posts:post_detail', args=(self.post.pk,)),
+            ):
+                with self.subTest(url=url):
+                    response = self.client.get(url)
+                    self.assertContains(response, TEXT_ONE)
+                    self.assertNotContains(response, TEXT_TWO)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).text, TEXT_TWO)
+
+    def test_author_sees_own_post_after_write(self):
+        """
+        Новое поколение ленты не собирается с отстающей реплики: ни
+        кеш, заполненный другим посетителем, ни ETag не прячут пост.
+        """
+        response = self.author_client.post(
+            reverse('posts:post_create'), {'text': TEXT_TWO}
+        )
+        self.assertIn(ReplicaPinMiddleware.cookie_name, response.cookies)
+        url = reverse('posts:profile', args=(USER_ONE,))
+        anonymous = self.client.get(url)
+        self.assertContains(anonymous, TEXT_TWO)
+        self.assertContains(self.reader_client.get(url), TEXT_TWO)
+        self.assertContains(self.author_client.get(url), TEXT_TWO)
+        self.replicate()
+        with self.settings(DATABASE_PIN_SECONDS=0):
+            revalidated = self.client.get(
+                url, HTTP_IF_NONE_MATCH=anonymous['ETag']
+            )
+            self.assertEqual(revalidated.status_code, 304)
+            self.assertContains(self.client.get(url), TEXT_TWO)
+
+    def test_stale_replica_is_not_cached(self):
+        """Запись не из браузера (воркер, команда) видна в ленте сразу."""
+        url = reverse('posts:profile', args=(USER_ONE,))
+        Post.objects.create(text=TEXT_TWO, author=self.author)
+        first = self.client.get(url)
+        self.assertContains(first, TEXT_TWO)
+        self.replicate()
+        with self.settings(DATABASE_PIN_SECONDS=0):
+            self.assertContains(self.client.get(url), TEXT_TWO)
+
+    def test_reads_do_not_pin(self):
+        """Чтение не закрепляет браузер за основной базой."""
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertNotIn(ReplicaPinMiddleware.cookie_name, response.cookies)
@@ -0,0 +1,86 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import stem
+from ..views import num_of_pub
+from .test_views import USER_ONE
+
+User = get_user_model()
+CATS = 'Кошки любят спать на теплых подоконниках'
+CAT = 'Моя кошка спала весь день, кошке было тепло'
+DOG = 'Собака гуляет во дворе'
+
+
+# python3 manage.py test posts.tests.test_search для запуска тестов
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_ONE)
+        cls.cats = Post.objects.create(text=CATS, author=cls.user)
+        cls.cat = Post.objects.create(text=CAT, author=cls.user)
+        cls.dog = Post.objects.create(text=DOG, author=cls.user)
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return response.context['page_obj']
+
+    def test_stemmer_joins_word_forms(self):
+        """Формы одного слова сводятся к общей основе."""
+        for words in (('кошка', 'кошки', 'кошке'), ('теплых', 'теплый')):
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+    def test_search_finds_word_forms_ranked(self):
+        """Поиск находит формы слова, чаще упомянутое выше."""
+        page_obj = self.search('КОШКУ')
+        self.assertEqual(list(page_obj), [self.cat, self.cats])
+        self.assertEqual(page_obj.paginator.count, 2)
+
+    def test_index_follows_post_lifecycle(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.dog.text = CATS
+        self.dog.save()
+        self.assertIn(self.dog, self.search('подоконник'))
+        self.assertNotIn(self.dog, self.search('собака'))
+        self.dog.delete()
+        self.assertEqual(list(self.search('подоконник')), [self.cats])
+
+    def test_search_pages_keep_query(self):
+        """Ссылки пагинатора сохраняют поисковый запрос."""
+        Post.objects.bulk_create(
+            Post(text=DOG, author=self.user) for _ in range(num_of_pub)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.client.get(reverse('posts:search'), {'q': 'собаки'})
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         num_of_pub + 1)
+        self.assertContains(response, '?q=%D1%81%D0%BE%D0%B1%D0%B0%D0%BA'
+                                      '%D0%B8&amp;page=2')
+        self.assertEqual(len(self.search('собаки', page=2)), 1)
+
+    def test_empty_query_shows_form_only(self):
+        """Без запроса индекс не трогается."""
+        response = self.client.get(reverse('posts:search'))
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет через тот же индекс."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кошками'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list), {self.cat, self.cats}
+        )
@@ -0,0 +1,49 @@
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from core.servers import make_server
+
+THREADS = 2
+REQUESTS = 6
+
+
+# python3 manage.py test posts.tests.test_servers для запуска тестов
+class PooledServerTests(SimpleTestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def app(self, environ, start_response):
+        """Медленная view: держит поток, пока идут соседние запросы."""
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [threading.current_thread().name.encode()]
+
+    def test_requests_are_served_by_bounded_pool(self):
+        """Запросы обслуживаются параллельно, но не больше пула."""
+        server = make_server('127.0.0.1', 0, self.app, threads=THREADS)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        url = f'http://127.0.0.1:{server.server_address[1]}/'
+        try:
+            with ThreadPoolExecutor(max_workers=REQUESTS) as clients:
+                names = list(clients.map(
+                    lambda _: urllib.request.urlopen(url).read().decode(),
+                    range(REQUESTS),
+                ))
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+        self.assertEqual(self.peak, THREADS)
+        self.assertEqual(len(set(names)), THREADS)
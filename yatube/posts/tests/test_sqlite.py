@@ -0,0 +1,52 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+
+# python3 manage.py test posts.tests.test_sqlite для запуска тестов
+class SQLiteTuningTests(SimpleTestCase):
+    def test_new_connection_gets_pragmas(self):
+        """Новое соединение сразу получает SQLITE_PRAGMAS."""
+        with tempfile.TemporaryDirectory() as tmp:
+            wrapper = DatabaseWrapper(
+                dict(
+                    connections['default'].settings_dict,
+                    NAME=os.path.join(tmp, 'tuned.sqlite3'),
+                ),
+                alias='tuned',
+            )
+            try:
+                with wrapper.cursor() as cursor:
+                    values = {}
+                    for name in ('journal_mode', 'busy_timeout',
+                                 'synchronous'):
+                        cursor.execute(f'PRAGMA {name}')
+                        values[name] = cursor.fetchone()[0]
+            finally:
+                wrapper.close()
+        self.assertEqual(values, {
+            'journal_mode': settings.SQLITE_PRAGMAS['journal_mode'].lower(),
+            'busy_timeout': settings.SQLITE_PRAGMAS['busy_timeout'],
+            # NORMAL
+            'synchronous': 1,
+        })
+
+    def test_write_benchmark_reports_both_modes(self):
+        """Нагрузочный тест сравнивает журнал отката и WAL."""
+        out = StringIO()
+        call_command(
+            'benchmark_sqlite_writes',
+            writers=2, readers=2, operations=5, stdout=out,
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        for line in lines:
+            self.assertIn('ошибок «locked» 0', line)
+        self.assertTrue(lines[0].startswith('journal'))
+        self.assertTrue(lines[2].startswith('tuned'))
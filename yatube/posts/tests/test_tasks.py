@@ -0,0 +1,93 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Task
+from core.tasks import get_broker, task
+from ..models import Follow, Post, TimelineEntry
+from ..search import get_backend
+from .test_views import TEXT_ONE, USER_ONE, USER_TWO
+
+User = get_user_model()
+
+
+@task(max_retries=1)
+def failing_task():
+    raise ValueError('сбой задачи')
+
+
+# python3 manage.py test posts.tests.test_tasks для запуска тестов
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class TaskQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_ONE)
+        cls.reader = User.objects.create_user(username=USER_TWO)
+
+    def run_worker(self):
+        call_command(
+            'task_worker', processes=0, burst=True,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def test_write_side_effects_run_in_worker(self):
+        """Лента подписчика и поиск обновляются воркером, а не запросом."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text=TEXT_ONE, author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(
+            set(Task.objects.values_list('name', flat=True)),
+            {'posts.timelines.backfill', 'posts.timelines.fan_out',
+             'posts.search.reindex_post'},
+        )
+        self.run_worker()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post
+        ).exists())
+        self.assertEqual(get_backend().count(TEXT_ONE), 1)
+        self.assertFalse(
+            Task.objects.exclude(status=Task.DONE).exists()
+        )
+
+    def test_failed_task_is_retried_with_backoff(self):
+        """Упавшая задача повторяется позже, затем помечается ошибкой."""
+        failing_task.delay()
+        self.run_worker()
+        queued = Task.objects.get()
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertEqual(queued.attempts, 1)
+        self.assertGreater(queued.run_at, timezone.now())
+        self.run_worker()
+        self.assertEqual(Task.objects.get().status, Task.QUEUED)
+        Task.objects.update(run_at=timezone.now())
+        self.run_worker()
+        failed = Task.objects.get()
+        self.assertEqual(failed.status, Task.FAILED)
+        self.assertIn('сбой задачи', failed.last_error)
+
+    def test_stale_running_task_is_claimed_again(self):
+        """Задачу упавшего воркера забирает другой после таймаута."""
+        failing_task.delay()
+        started = timezone.now() - timedelta(hours=1)
+        Task.objects.update(status=Task.RUNNING, started=started, attempts=1)
+        claimed = get_broker().claim(10)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(claimed[0].attempts, 2)
+
+    def test_queue_stats_are_staff_only(self):
+        """Глубину очереди и задержки видит только staff."""
+        failing_task.delay()
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('task_metrics'))
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(staff)
+        stats = self.client.get(reverse('task_metrics')).json()
+        self.assertEqual(stats['queued'], 1)
+        self.assertEqual(stats['failed'], 0)
@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..thumbnails import ready_thumbnail
+from .test_views import TEXT_ONE, USER_ONE
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+# python3 manage.py test posts.tests.test_thumbnails для запуска тестов
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_ONE)
+        cls.post = Post.objects.create(
+            text=TEXT_ONE,
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='thumb.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def get_detail(self):
+        cache.clear()
+        return self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Пока миниатюры нет, страница не режет картинку сама."""
+        response = self.get_detail()
+        self.assertContains(response, 'img/placeholder.svg')
+        self.assertIsNone(ready_thumbnail(self.post.image, 'feed'))
+
+    def test_backfill_command_creates_thumbnails(self):
+        """Команда generate_thumbnails создает недостающие миниатюры."""
+        # Тестовая база живет в памяти процесса, поэтому режем без пула
+        call_command('generate_thumbnails', workers=0, stdout=StringIO())
+        thumbnail = ready_thumbnail(self.post.image, 'feed')
+        self.assertIsNotNone(thumbnail)
+        response = self.get_detail()
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, 'img/placeholder.svg')
+
+    def test_ready_thumbnail_changes_validators(self):
+        """Готовая миниатюра меняет ETag: 304 не оставляет заглушку."""
+        cache.clear()
+        urls = (
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:profile', args=(USER_ONE,)),
+        )
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        call_command('generate_thumbnails', workers=0, stdout=StringIO())
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotContains(response, 'img/placeholder.svg')
@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+from ..paginators import SHALLOW_PAGES
+from ..views import num_of_pub
+from .test_views import TEXT_ONE, TEXT_TWO, USER_ONE, USER_TWO
+
+User = get_user_model()
+
+
+# python3 manage.py test posts.tests.test_timelines для запуска тестов
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_ONE)
+        cls.reader = User.objects.create_user(username=USER_TWO)
+        cls.old_post = Post.objects.create(text=TEXT_ONE, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow(self):
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': USER_ONE}
+        ))
+
+    def feed(self, **params):
+        response = self.reader_client.get(
+            reverse('posts:follow_index'), params
+        )
+        return response.context['page_obj']
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка заполняет ленту, отписка очищает ее."""
+        self.follow()
+        self.assertEqual(list(self.feed()), [self.old_post])
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': USER_ONE}
+        ))
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_new_post_is_fanned_out(self):
+        """Новый пост автора сразу записывается в ленты подписчиков."""
+        self.follow()
+        post = Post.objects.create(text=TEXT_TWO, author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed()[0], post)
+
+    def test_heavy_author_is_pulled_on_read(self):
+        """
+        Посты популярного автора не раздаются, а подтягиваются
+        при чтении.
+        """
+        self.follow()
+        with mock.patch('posts.timelines.FANOUT_FOLLOWERS_LIMIT', 0):
+            post = Post.objects.create(text=TEXT_TWO, author=self.author)
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=post).exists()
+            )
+            self.assertEqual(self.feed()[0], post)
+
+    def test_follow_feed_cursor_pagination(self):
+        """Лента подписок листается курсором до самого конца."""
+        self.follow()
+        Post.objects.bulk_create(
+            Post(text=TEXT_TWO, author=self.author)
+            for _ in range(num_of_pub * SHALLOW_PAGES)
+        )
+        Follow.objects.all().delete()
+        self.follow()
+        page = self.feed(page=SHALLOW_PAGES)
+        seen = num_of_pub * (SHALLOW_PAGES - 1) + len(page)
+        while page.has_next():
+            page = self.feed(cursor=page.next_cursor)
+            seen += len(page)
+        self.assertEqual(seen, Post.objects.count())
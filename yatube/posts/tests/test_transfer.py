@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import following
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+from ..search import get_backend
+from ..transfer import TRANSFER_MODELS
+from .test_views import (DESCRIPTION, FIRST_TITLE, SLUG, TEXT_ONE, TEXT_TWO,
+                         USER_ONE, USER_TWO)
+
+User = get_user_model()
+
+
+# python3 manage.py test posts.tests.test_transfer для запуска тестов
+class TransferCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_ONE)
+        cls.reader = User.objects.create_user(username=USER_TWO)
+        cls.group = Group.objects.create(
+            title=FIRST_TITLE, slug=SLUG, description=DESCRIPTION
+        )
+        cls.post = Post.objects.create(
+            text=f'{TEXT_ONE},\n"в кавычках"', author=cls.author,
+            group=cls.group,
+        )
+        Post.objects.create(text=TEXT_TWO, author=cls.reader)
+        Comment.objects.create(post=cls.post, author=cls.reader, text=TEXT_TWO)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir, name)
+
+    def snapshot(self):
+        snapshot = {
+            name: list(model.objects.order_by('pk').values_list(*fields))
+            for name, (model, fields) in TRANSFER_MODELS.items()
+        }
+        return {
+            **snapshot,
+            'comments_count': list(
+                Post.objects.values_list('comments_count')
+            ),
+            'stats': list(
+                User.objects.values_list('stats__posts_count',
+                                         'stats__followers_count')
+            ),
+        }
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка возвращают те же строки и счетчики."""
+        for fmt in ('ndjson', 'csv'):
+            with self.subTest(fmt=fmt):
+                before = self.snapshot()
+                for name in TRANSFER_MODELS:
+                    call_command('export_data', name,
+                                 self.path(f'{name}.{fmt}'), stdout=StringIO())
+                for model in (Follow, Comment, Post, Group):
+                    model.objects.all().delete()
+                for name in TRANSFER_MODELS:
+                    call_command('import_data', name,
+                                 self.path(f'{name}.{fmt}'), stdout=StringIO())
+                self.assertEqual(self.snapshot(), before)
+                self.assertEqual(
+                    get_backend().ranked_ids(TEXT_ONE, 0, 10), [self.post.pk]
+                )
+
+    def test_import_resumes_from_checkpoint(self):
+        """Загрузка продолжается после последней сохраненной пачки."""
+        path = self.path('posts.ndjson')
+        checkpoint = self.path('posts.checkpoint')
+        call_command('export_data', 'posts', path, stdout=StringIO())
+        Post.objects.all().delete()
+        with open(checkpoint, 'w') as stream:
+            json.dump({'rows': 1}, stream)
+        out = StringIO()
+        call_command('import_data', 'posts', path, checkpoint=checkpoint,
+                     batch_size=1, stdout=out)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertIn('строк/с', out.getvalue())
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_import_resets_feed_caches(self):
+        """Загруженные посты сразу видны в закешированных лентах."""
+        path = self.path('posts.ndjson')
+        call_command('export_data', 'posts', path, stdout=StringIO())
+        Post.objects.all().delete()
+        url = reverse('posts:profile', args=(USER_TWO,))
+        self.assertNotContains(self.client.get(url), TEXT_TWO)
+        call_command('import_data', 'posts', path, skip_recount=True,
+                     stdout=StringIO())
+        self.assertContains(self.client.get(url), TEXT_TWO)
+
+    def test_import_resets_followed_authors(self):
+        """Загруженные подписки сразу видны в кеше подписок читателя."""
+        path = self.path('follows.ndjson')
+        call_command('export_data', 'follows', path, stdout=StringIO())
+        Follow.objects.all().delete()
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertEqual(len(following.followed_authors(reader)), 0)
+        call_command('import_data', 'follows', path, skip_recount=True,
+                     stdout=StringIO())
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertIn(self.author.pk, following.followed_authors(reader))
+
+    def test_import_fills_timelines(self):
+        """Загруженные посты и подписки попадают в ленту подписок."""
+        for name, model in (('posts', Post), ('follows', Follow)):
+            with self.subTest(name=name):
+                path = self.path(f'{name}.ndjson')
+                call_command('export_data', name, path, stdout=StringIO())
+                model.objects.all().delete()
+                TimelineEntry.objects.all().delete()
+                call_command('import_data', name, path, skip_recount=True,
+                             stdout=StringIO())
+                self.assertTrue(
+                    TimelineEntry.objects.filter(
+                        user=self.reader, post=self.post
+                    ).exists()
+                )
+
+    def test_export_resumes_from_checkpoint(self):
+        """Выгрузка дописывает файл после последней сохраненной пачки."""
+        path = self.path('posts.csv')
+        checkpoint = self.path('posts.checkpoint')
+        call_command('export_data', 'posts', path, batch_size=1,
+                     stdout=StringIO())
+        with open(path, newline='', encoding='utf-8') as stream:
+            full = stream.read()
+        first = Post.objects.order_by('pk').first()
+        Post.objects.create(text=TEXT_TWO, author=self.author)
+        with open(path, 'r+', encoding='utf-8') as stream:
+            stream.seek(0, os.SEEK_END)
+            stream.write('недописанная строка')
+        header_and_first = full[:full.index(f'\r\n{first.pk + 1},') + 2]
+        with open(checkpoint, 'w') as stream:
+            json.dump({'rows': 1, 'last_pk': first.pk,
+                       'offset': len(header_and_first.encode())}, stream)
+        call_command('export_data', 'posts', path, checkpoint=checkpoint,
+                     stdout=StringIO())
+        with open(path, newline='', encoding='utf-8') as stream:
+            resumed = stream.read()
+        self.assertTrue(resumed.startswith(header_and_first))
+        self.assertEqual(resumed.count('\r\n'), 1 + 3)
+        self.assertNotIn('недописанная строка', resumed)
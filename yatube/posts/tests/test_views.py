@@ -8,9 +8,13 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from ..models import Group, Post, Follow
-from ..views import num_of_pub
+from .. import following
+from ..models import Comment, Group, Post, Follow
+from ..views import comments_per_page, num_of_pub
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -215,10 +219,8 @@ class PostViewsTests(TestCase):
         cache.clear()
         response = self.authorized_client.get(reverse('posts:index'))
         posts = response.content
-        Post.objects.create(
-            text=TEXT_TWO,
-            author=self.user,
-        )
+        # update() не шлет сигналов и не сдвигает поколение ленты
+        Post.objects.filter(pk=self.post.pk).update(text=TEXT_ONE)
         response_cache_one = self.authorized_client.get(reverse('posts:index'))
         posts_with_cache = response_cache_one.content
         self.assertEqual(posts_with_cache, posts)
@@ -227,6 +229,37 @@ class PostViewsTests(TestCase):
         new_posts = response_without_cache.content
         self.assertNotEqual(posts_with_cache, new_posts)
 
+    def test_new_post_invalidates_only_its_feeds(self):
+        """Новый пост сбрасывает кеш своих лент и не трогает чужие."""
+        cache.clear()
+        pages = {
+            reverse('posts:index'): True,
+            reverse('posts:group_list', kwargs={'slug': SLUG}): True,
+            reverse('posts:profile', kwargs={'username': USER_ONE}): True,
+            reverse('posts:group_list',
+                    kwargs={'slug': SECOND_SLUG}): False,
+            reverse('posts:profile', kwargs={'username': USER_TWO}): False,
+        }
+        before = {url: self.client.get(url).content for url in pages}
+        Post.objects.filter(group=self.second_group).update(text=TEXT_ONE)
+        Post.objects.create(
+            text='Совсем новый пост',
+            author=self.user,
+            group=self.group,
+        )
+        for url, changed in pages.items():
+            with self.subTest(url=url):
+                content = self.client.get(url).content
+                self.assertEqual(content != before[url], changed)
+
+    def test_anonymous_feed_page_is_cached_whole(self):
+        """Анонимная страница ленты отдается из кеша без запросов к БД."""
+        cache.clear()
+        url = reverse('posts:group_list', kwargs={'slug': SECOND_SLUG})
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
     class FollowTests(TestCase):
         @classmethod
         def setUpClass(cls):
@@ -294,3 +327,205 @@ class PostViewsTests(TestCase):
             """Запись не появляется у неподписанных пользователей"""
             response = self.authorized_client.get(reverse('posts:follow_index'))
             self.assertNotContains(response, self.post.text)
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title=FIRST_TITLE,
+            slug=SLUG,
+            description=DESCRIPTION,
+        )
+        cls.authors = [
+            User.objects.create_user(username=f'{USER_ONE}{number}')
+            for number in range(num_of_pub)
+        ]
+
+    def count_feed_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': SLUG}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                Post.objects.all().delete()
+                Post.objects.create(
+                    text=TEXT_ONE, author=self.authors[0], group=self.group
+                )
+                single = self.count_feed_queries(url)
+                for author in self.authors:
+                    Post.objects.create(
+                        text=TEXT_TWO, author=author, group=self.group
+                    )
+                self.assertEqual(self.count_feed_queries(url), single)
+
+    def test_follow_state_comes_from_cache(self):
+        """Подписки читаются одним запросом, дальше берутся из кеша."""
+        author, reader = self.authors[:2]
+        Follow.objects.create(user=reader, author=author)
+        Post.objects.create(text=TEXT_ONE, author=author, group=self.group)
+        self.client.force_login(reader)
+        cache.clear()
+        urls = (
+            reverse('posts:profile', args=(author.username,)),
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': SLUG}),
+        )
+        with CaptureQueriesContext(connection) as queries:
+            for url in urls:
+                response = self.client.get(url)
+                self.assertContains(
+                    response,
+                    reverse('posts:profile_unfollow', args=(author.username,))
+                )
+        follow_queries = [
+            query['sql'] for query in queries
+            if 'posts_follow' in query['sql']
+        ]
+        self.assertEqual(len(follow_queries), 1)
+
+    def test_follow_buttons_update_in_place(self):
+        """Подписка и отписка сразу меняют кнопки в ленте."""
+        author, reader = self.authors[:2]
+        Post.objects.create(text=TEXT_ONE, author=author)
+        self.client.force_login(reader)
+        follow_url = reverse('posts:profile_follow', args=(author.username,))
+        unfollow_url = reverse(
+            'posts:profile_unfollow', args=(author.username,)
+        )
+        index = reverse('posts:index')
+        self.assertContains(self.client.get(index), follow_url)
+        self.client.get(follow_url)
+        self.assertContains(self.client.get(index), unfollow_url)
+        # Массив загружен заново один раз и дальше читается из кеша.
+        reader = User.objects.get(pk=reader.pk)
+        with self.assertNumQueries(0):
+            self.assertIn(author.pk, following.followed_authors(reader))
+        self.client.get(unfollow_url)
+        self.assertContains(self.client.get(index), follow_url)
+
+    def test_late_cache_write_does_not_hide_follows(self):
+        """
+        Массив, прочитанный до подписок и записанный в кеш после них,
+        ложится под старую версию и не прячет новые подписки.
+        """
+        reader, *authors = self.authors[:3]
+        stale_key = following._key(reader.pk, following._version(reader.pk))
+        for author in authors:
+            Follow.objects.create(user=reader, author=author)
+        cache.set(stale_key, b'', following.FOLLOWED_TIMEOUT)
+        reader = User.objects.get(pk=reader.pk)
+        self.assertEqual(
+            following.followed_authors(reader).ids,
+            {author.pk for author in authors},
+        )
+
+    def test_feed_shows_author_post_counts(self):
+        """Счетчик постов автора считается для всей страницы сразу."""
+        for _ in range(POSTS_OF_SECOND_AUTHOR):
+            Post.objects.create(text=TEXT_ONE, author=self.authors[1])
+        cache.clear()
+        response = self.client.get(reverse('posts:index'))
+        for post in response.context['page_obj']:
+            self.assertEqual(post.author_posts_count, POSTS_OF_SECOND_AUTHOR)
+
+
+class PostFragmentCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_ONE)
+        cls.other = User.objects.create_user(username=USER_TWO)
+        cls.post = Post.objects.create(text=TEXT_ONE, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def test_feed_reuses_rendered_articles(self):
+        """Сброшенная лента собирается из готовых статей постов."""
+        self.client.get(reverse('posts:index'))
+        # update() не меняет updated: статья поста берется из кеша.
+        Post.objects.filter(pk=self.post.pk).update(text=TEXT_TWO)
+        Post.objects.create(text='Совсем новый пост', author=self.other)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Совсем новый пост')
+        self.assertContains(response, TEXT_ONE)
+
+    def test_article_changes_after_edit_and_comment(self):
+        """Правка и комментарий сбрасывают статью поста."""
+        self.client.get(reverse('posts:index'))
+        self.author_client.post(
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            {'text': TEXT_TWO},
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, TEXT_TWO)
+        Comment.objects.create(
+            post=self.post, author=self.user, text=TEXT_ONE
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 1')
+
+
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_ONE)
+        cls.post = Post.objects.create(text=TEXT_ONE, author=cls.author)
+        commentators = [
+            User.objects.create_user(username=f'{USER_TWO}{number}')
+            for number in range(comments_per_page + 5)
+        ]
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=commentator, text=TEXT_TWO)
+            for commentator in commentators
+        )
+        # Вчерашний комментарий написан позже по часам, но идет первым.
+        cls.yesterday = Comment.objects.create(
+            post=cls.post, author=cls.author, text=TEXT_ONE
+        )
+        Comment.objects.filter(pk=cls.yesterday.pk).update(
+            created=timezone.now() - timezone.timedelta(hours=23, minutes=59)
+        )
+
+    def test_post_detail_shows_first_comments_page(self):
+        """На странице поста только первая порция комментариев."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), comments_per_page)
+        self.assertEqual(comments[0], self.yesterday)
+        self.assertTrue(comments.has_next())
+
+    def test_more_comments_fragment(self):
+        """Фрагмент «Показать еще» отдает оставшиеся комментарии."""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        first = self.client.get(url).context['comments']
+        response = self.client.get(f'{url}?{first.next_query}')
+        self.assertTemplateUsed(response, 'includes/comments_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        rest = response.context['comments']
+        self.assertEqual(len(rest), Comment.objects.count() - len(first))
+        self.assertFalse(rest.has_next())
+        self.assertTrue(set(first).isdisjoint(rest))
+
+    def test_comment_authors_are_loaded_with_comments(self):
+        """Авторы комментариев приходят одним запросом со страницей."""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        next_query = self.client.get(url).context['comments'].next_query
+        with self.assertNumQueries(2):
+            self.client.get(f'{url}?{next_query}')
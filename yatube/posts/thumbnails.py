@@ -0,0 +1,79 @@
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile
+
+from core.tasks import task
+
+from .caching import bump_feeds, post_feeds
+from .models import Post
+
+# Стандартные варианты картинок поста: имя -> (геометрия, опции sorl).
+THUMBNAIL_SIZES = {
+    'feed': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Пул процессов команды generate_thumbnails.
+THUMBNAIL_WORKERS: int = 2
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    def _thumbnail_options(self, source, options):
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """
+        Готовая миниатюра из key-value хранилища sorl или None.
+        В отличие от get_thumbnail, никогда не декодирует исходник.
+        """
+        source = ImageFile(file_)
+        options = self._thumbnail_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+backend = PostThumbnailBackend()
+
+
+def ready_thumbnail(image, size):
+    if not image:
+        return None
+    geometry, options = THUMBNAIL_SIZES[size]
+    return backend.get_ready_thumbnail(image, geometry, **options)
+
+
+@task
+def generate_thumbnails(name):
+    """Создает все стандартные варианты картинки (выполняется в воркере)."""
+    created = False
+    for geometry, options in THUMBNAIL_SIZES.values():
+        if backend.get_ready_thumbnail(name, geometry, **options) is None:
+            backend.get_thumbnail(name, geometry, **options)
+            created = True
+    if created:
+        # Страницы и ETag лент с постом до сих пор отдавали заглушку.
+        posts = Post.objects.filter(image=name).values_list(
+            'author_id', 'group_id'
+        )
+        bump_feeds(*(
+            feed for author_id, group_id in posts
+            for feed in post_feeds(author_id, group_id)
+        ))
+    return name
+
+
+def schedule_thumbnails(image):
+    """
+    Ставит нарезку миниатюр в очередь фоновых задач: ресайз в PIL
+    упирается в CPU, а task_worker выполняет задачи в пуле процессов.
+    """
+    if image:
+        generate_thumbnails.delay(image.name)
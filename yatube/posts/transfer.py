@@ -0,0 +1,203 @@
+"""
+Потоковый импорт и экспорт данных постов (NDJSON и CSV).
+
+Строки переносятся вместе с первичными ключами, поэтому ссылки между
+файлами (post_id в комментариях, group_id в постах) остаются верными.
+Пользователи не переносятся: авторы должны уже быть в базе.
+"""
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from . import following, timelines
+from .caching import author_feed, bump_feeds, group_feed, post_feeds
+from .models import Comment, Follow, Group, Post
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+FORMATS = (NDJSON, CSV)
+TRANSFER_BATCH_SIZE: int = 5000
+
+# Имя в командной строке -> (модель, переносимые поля).
+TRANSFER_MODELS = {
+    'groups': (Group, ('id', 'title', 'slug', 'description')),
+    'posts': (Post, (
+        'id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+    )),
+    'comments': (Comment, ('id', 'post_id', 'author_id', 'text', 'created')),
+    'follows': (Follow, ('id', 'user_id', 'author_id', 'created')),
+}
+
+
+def touched_feeds(model, objects):
+    """
+    Ленты, в которых видны строки пачки: bulk_create обходит сигналы,
+    поэтому поколения этих лент сдвигает сама команда.
+    """
+    feeds = set()
+    if model is Group:
+        feeds.update(group_feed(obj.pk) for obj in objects)
+    elif model is Post:
+        for obj in objects:
+            feeds.update(post_feeds(obj.author_id, obj.group_id))
+    elif model is Comment:
+        posts = Post.objects.filter(
+            pk__in={obj.post_id for obj in objects}
+        ).values_list('author_id', 'group_id').distinct()
+        for author_id, group_id in posts:
+            feeds.update(post_feeds(author_id, group_id))
+    elif model is Follow:
+        for obj in objects:
+            feeds.add(author_feed(obj.user_id))
+            feeds.add(author_feed(obj.author_id))
+    return feeds
+
+
+def refresh_caches(model, objects):
+    """Сбрасывает после bulk_create то, что сбросили бы сигналы."""
+    bump_feeds(*touched_feeds(model, objects))
+    if model is Follow:
+        following.invalidate(*{obj.user_id for obj in objects})
+
+
+def fill_timelines(model, objects):
+    """Раздает пачку в ленты подписок, как fan_out и backfill сигналов."""
+    if model is Post:
+        timelines.fan_out_posts(
+            [(obj.pk, obj.author_id, obj.pub_date) for obj in objects]
+        )
+    elif model is Follow:
+        timelines.backfill_follows(
+            [(obj.user_id, obj.author_id) for obj in objects]
+        )
+
+
+def guess_format(path):
+    return CSV if path.endswith('.csv') else NDJSON
+
+
+def model_field(model, attname):
+    for field in model._meta.concrete_fields:
+        if field.attname == attname:
+            return field
+    raise LookupError(attname)
+
+
+def to_python(field, value):
+    """Значение из файла в тип поля; пустая строка CSV — это NULL."""
+    if value == '' and field.null:
+        return None
+    if field.is_relation:
+        field = field.target_field
+    return field.to_python(value)
+
+
+@contextmanager
+def keep_auto_now_add(model):
+    """
+    bulk_create проставляет auto_now_add заново; на время импорта
+    поля с датами берутся из файла как есть.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _isoformat(value):
+    # DjangoJSONEncoder обрезает время до миллисекунд.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def write_rows(stream, fmt, fields, rows, header=True):
+    """Пишет кортежи значений в NDJSON или CSV."""
+    if fmt == CSV:
+        writer = csv.writer(stream)
+        if header:
+            writer.writerow(fields)
+        for row in rows:
+            writer.writerow(
+                ['' if value is None else
+                 value.isoformat() if hasattr(value, 'isoformat') else value
+                 for value in row]
+            )
+        return
+    for row in rows:
+        stream.write(json.dumps(
+            dict(zip(fields, row)), default=_isoformat, ensure_ascii=False
+        ))
+        stream.write('\n')
+
+
+def read_rows(stream, fmt):
+    """Лениво читает строки файла как словари."""
+    if fmt == CSV:
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+class Checkpoint:
+    """
+    Файл с прогрессом переноса: сколько строк обработано, последний
+    выгруженный pk и размер готовой части выходного файла. Пишется
+    атомарно после каждой пачки, поэтому прерванный перенос
+    продолжается с последней завершенной пачки.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if path and os.path.exists(path):
+            with open(path) as stream:
+                self.state = json.load(stream)
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def save(self, **state):
+        self.state.update(state)
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as stream:
+            json.dump(self.state, stream)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Throughput:
+    """Счетчик строк и скорости (строк в секунду) для отчета команды."""
+
+    def __init__(self, done=0):
+        self.done = done
+        self.session = 0
+        self.started = time.perf_counter()
+
+    def add(self, rows):
+        self.done += rows
+        self.session += rows
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.session / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        return f'{self.done} строк, {self.rate:.0f} строк/с'
@@ -0,0 +1,104 @@
+import warnings
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import (StopUpload,
+                                             TemporaryFileUploadHandler)
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# Сколько байт начала файла ждать, чтобы узнать формат и размеры.
+SNIFF_LIMIT: int = 256 * 1024
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет картинку во временный файл по кускам и проверяет ее на лету:
+    формат и размеры берутся из заголовка, а лишние байты или пиксели
+    обрывают загрузку, не дочитывая тело запроса. Проверенный временный
+    файл затем переносится в MEDIA_ROOT без повторного копирования.
+    """
+    chunk_size = 64 * 2 ** 10
+
+    def __init__(self, request=None, field_names=('image',)):
+        super().__init__(request)
+        self.field_names = field_names
+        self.max_bytes = settings.POSTS_UPLOAD_MAX_BYTES
+        self.max_pixels = settings.POSTS_UPLOAD_MAX_PIXELS
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.checking = field_name in self.field_names
+        self.header = b''
+        self.received = 0
+        self.sniffed = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.checking:
+            self.received += len(raw_data)
+            if self.received > self.max_bytes:
+                self.reject(
+                    'Файл больше '
+                    f'{filesizeformat(self.max_bytes)}.'
+                )
+            if not self.sniffed:
+                self.header += raw_data
+                self.sniff()
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if self.checking and not self.sniffed:
+            self.reject('Загрузите правильное изображение.')
+        return super().file_complete(file_size)
+
+    def sniff(self):
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', Image.DecompressionBombWarning)
+                image = Image.open(BytesIO(self.header))
+        except (Image.DecompressionBombWarning,
+                Image.DecompressionBombError):
+            self.reject('Слишком большое разрешение изображения.')
+        except Exception:
+            # Заголовок мог еще не прийти целиком: ждем следующий кусок.
+            if len(self.header) >= SNIFF_LIMIT:
+                self.reject('Загрузите правильное изображение.')
+            return
+        self.sniffed = True
+        self.header = b''
+        width, height = image.size
+        if image.format not in ALLOWED_FORMATS:
+            self.reject(
+                f'Формат {image.format} не поддерживается. Разрешены: '
+                f'{", ".join(ALLOWED_FORMATS)}.'
+            )
+        if width * height > self.max_pixels:
+            self.reject(
+                f'Слишком большое разрешение: {width}×{height}.'
+            )
+
+    def reject(self, message):
+        self.file.close()
+        errors = getattr(self.request, 'upload_errors', {})
+        errors[self.field_name] = message
+        self.request.upload_errors = errors
+        raise StopUpload(connection_reset=True)
+
+
+def stream_image_uploads(view):
+    """
+    Подключает ImageUploadHandler к view. Обработчики загрузки можно
+    менять только до чтения request.POST, а CsrfViewMiddleware читает
+    его раньше view, поэтому CSRF проверяется уже внутри обертки.
+    """
+    protected_view = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return protected_view(request, *args, **kwargs)
+    return wrapper
@@ -1,64 +1,206 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.routers import replica_reads
+
+from .caching import (HOT_FEED, INDEX_FEED, author_feed, cached_feed_page,
+                      feed_cache_key, group_feed)
+from .conditional import (author_feed_of, author_of, feed_condition,
+                          following, group_feed_of, group_of,
+                          html_feed_parts, html_post_parts,
+                          html_profile_parts, http_cache, post_condition)
+from .feeds import (FEED_SORTS, author_posts_count, author_stats,
+                    feed_queryset,
+                    feed_sort, index_posts_count, load_feed_page,
+                    timeline_queryset)
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User, Follow
+from .hot import HOT_ORDERING
+from .models import HotPost, Post, User, Follow
+from .paginators import (CursorPaginator, HotPaginator, RankedPaginator,
+                         TimelinePaginator)
+from .search import get_backend
+from .thumbnails import schedule_thumbnails
+from .timelines import TIMELINE_ORDERING, timeline
+from .uploadhandlers import stream_image_uploads
 
 num_of_pub: int = 10
+comments_per_page: int = 20
+COMMENT_ORDERING = ('created', 'id')
+follows_per_page: int = 50
+FOLLOW_ORDERING = ('-id',)
 
 
-def general_paginator(request, paginator):
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+def general_paginator(request, post_list, count=None):
+    paginator = CursorPaginator(
+        feed_queryset(post_list),
+        num_of_pub,
+        ordering=FEED_SORTS[feed_sort(request)],
+        count=count,
+    )
+    page_obj = paginator.get_page(
+        request.GET.get('page'),
+        cursor=request.GET.get('cursor'),
+    )
+    return load_feed_page(page_obj)
 
 
+@replica_reads
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, num_of_pub)
-    page_obj = general_paginator(request, paginator)
-    context = {
-        'page_obj': page_obj,
-    }
-    return render(request, 'posts/index.html', context)
+    def render_page():
+        post_list = Post.objects.all()
+        page_obj = general_paginator(
+            request, post_list, index_posts_count()
+        )
+        context = {
+            'page_obj': page_obj,
+            'sort': feed_sort(request),
+            'feed_key': feed_cache_key(INDEX_FEED),
+        }
+        return render(request, 'posts/index.html', context)
+    return cached_feed_page(request, INDEX_FEED, render_page)
+
+
+def hot(request):
+    """Популярное: рейтинг заранее считает команда rank_hot_posts."""
+    def render_page():
+        paginator = HotPaginator(
+            timeline_queryset(HotPost.objects.all()),
+            num_of_pub,
+            ordering=HOT_ORDERING,
+        )
+        page_obj = load_feed_page(paginator.get_page(
+            request.GET.get('page'),
+            cursor=request.GET.get('cursor'),
+        ))
+        context = {
+            'page_obj': page_obj,
+            'feed_key': feed_cache_key(HOT_FEED),
+        }
+        return render(request, 'posts/hot.html', context)
+    return cached_feed_page(request, HOT_FEED, render_page)
 
 
+@replica_reads
+@http_cache
+@feed_condition(group_feed_of, html_feed_parts, personal=True)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.order_by('-pub_date')
-    paginator = Paginator(posts, num_of_pub)
-    page_obj = general_paginator(request, paginator)
+    group = group_of(request, slug)
+    feed = group_feed(group.pk)
+
+    def render_page():
+        posts = group.posts.all()
+        page_obj = general_paginator(request, posts, group.posts_count)
+        context = {
+            'group': group,
+            'page_obj': page_obj,
+            'sort': feed_sort(request),
+            'feed_key': feed_cache_key(feed),
+        }
+        return render(request, 'posts/group_list.html', context)
+    return cached_feed_page(request, feed, render_page)
+
+
+@replica_reads
+@http_cache
+@feed_condition(author_feed_of, html_profile_parts, personal=True)
+def profile(request, username):
+    author = author_of(request, username)
+    feed = author_feed(author.pk)
+
+    def render_page():
+        post_list = author.posts.all()
+        page_obj = general_paginator(
+            request, post_list, author_posts_count(author)
+        )
+        context = {
+            'author': author,
+            'page_obj': page_obj,
+            'following': following(request, username),
+            'stats': author_stats(author),
+            'sort': feed_sort(request),
+            'feed_key': feed_cache_key(feed),
+        }
+        return render(request, 'posts/profile.html', context)
+    return cached_feed_page(request, feed, render_page)
+
+
+def follow_list(request, author, follows, side, count, title):
+    """
+    Подписчики или подписки автора (side — поле Follow с нужным
+    пользователем): новые сверху, дальше по курсору по id подписки,
+    так что глубокие страницы не читают OFFSET.
+    """
+    paginator = CursorPaginator(
+        follows, follows_per_page, ordering=FOLLOW_ORDERING, count=count
+    )
+    page_obj = paginator.get_page(
+        request.GET.get('page'),
+        cursor=request.GET.get('cursor'),
+    )
     context = {
-        'group': group,
+        'author': author,
         'page_obj': page_obj,
+        'people': [getattr(follow, side) for follow in page_obj],
+        'title': title,
     }
-    return render(request, 'posts/group_list.html', context)
+    return render(request, 'posts/follow_list.html', context)
 
 
-def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.order_by('-pub_date')
-    paginator = Paginator(post_list, num_of_pub)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
-    else:
-        following = None
-    page_obj = general_paginator(request, paginator)
+@replica_reads
+def profile_followers(request, username):
+    author = author_of(request, username)
+    return follow_list(
+        request, author,
+        author.following.select_related('user'), 'user',
+        author_stats(author).followers_count,
+        'Подписчики',
+    )
+
+
+@replica_reads
+def profile_following(request, username):
+    author = author_of(request, username)
+    return follow_list(
+        request, author,
+        author.follower.select_related('author'), 'author',
+        author_stats(author).following_count,
+        'Подписки',
+    )
+
+
+def comments_paginator(request, post):
+    """
+    Первая страница комментариев и дальше по курсору: пост с тысячами
+    комментариев не рендерится целиком, а авторы приходят тем же запросом.
+    """
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        comments_per_page,
+        ordering=COMMENT_ORDERING,
+        shallow_pages=1,
+    )
+    return paginator.get_page(cursor=request.GET.get('cursor'))
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        paginator = RankedPaginator(get_backend().search(query), num_of_pub)
+        page_obj = load_feed_page(paginator.get_page(request.GET.get('page')))
     context = {
-        'author': author,
+        'query': query,
         'page_obj': page_obj,
-        'following': following,
     }
-    return render(request, 'posts/profile.html', context)
+    return render(request, 'posts/search.html', context)
 
 
+@replica_reads
+@http_cache
+@post_condition(html_post_parts, personal=True)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.order_by('created')
+    post = get_object_or_404(feed_queryset(Post.objects), pk=post_id)
+    comments = comments_paginator(request, post)
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
@@ -68,13 +210,29 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая порция комментариев: только фрагмент для «Показать еще»."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': comments_paginator(request, post),
+    }
+    return render(request, 'includes/comments_list.html', context)
+
+
 @login_required
+@stream_image_uploads
 def post_create(request):
-    form = PostForm(request.POST or None, files=request.FILES or None, )
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None,
+        upload_errors=getattr(request, 'upload_errors', None),
+    )
     if form.is_valid():
         create_post = form.save(commit=False)
         create_post.author = request.user
         create_post.save()
+        schedule_thumbnails(create_post.image)
         return redirect('posts:profile', create_post.author)
     context = {
         'form': form,
@@ -82,6 +240,7 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@stream_image_uploads
 def post_edit(request, post_id):
     edit_post = get_object_or_404(Post, pk=post_id)
     if request.user != edit_post.author:
@@ -89,10 +248,13 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=edit_post
+        instance=edit_post,
+        upload_errors=getattr(request, 'upload_errors', None),
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(edit_post.image)
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -113,12 +275,17 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    authors = request.user.follower.values('author')
-    posts = Post.objects.filter(author__in=authors)
-    paginator = Paginator(posts, num_of_pub)
-    page_obj = general_paginator(request, paginator)
+    entries = timeline_queryset(timeline(request.user))
+    paginator = TimelinePaginator(
+        entries, num_of_pub, ordering=TIMELINE_ORDERING
+    )
+    page_obj = load_feed_page(paginator.get_page(
+        request.GET.get('page'),
+        cursor=request.GET.get('cursor'),
+    ))
     context = {
         'page_obj': page_obj,
     }
@@ -130,7 +297,7 @@ def profile_follow(request, username):
     # Подписаться на автора
     author = get_object_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.create(
+        Follow.objects.get_or_create(
             user=request.user,
             author=author,
         )
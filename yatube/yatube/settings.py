@@ -10,7 +10,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '$&eq=_s6s(#w6oelemqmg^n7x!n7)^x3w+=tywr-fcxrqreb^g'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('YATUBE_DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -36,30 +36,43 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.routers.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # Шаблоны компилируются один раз на процесс, а не на каждый рендер.
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.InstrumentedTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.followed_authors',
             ],
         },
     },
@@ -74,7 +87,40 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живет между запросами, и SQLITE_PRAGMAS
+        # выполняются раз на соединение, а не на каждый запрос.
+        'CONN_MAX_AGE': 60,
+    }
+}
+
+# Реплики для чтения лент: пути к копиям базы через запятую,
+# например YATUBE_DB_REPLICAS=/var/lib/yatube/replica.sqlite3
+for index, path in enumerate(
+    filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(','))
+):
+    DATABASES[f'replica{index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
     }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Сколько секунд после записи браузер читает только с основной базы.
+DATABASE_PIN_SECONDS = 15
+
+# PRAGMA для каждого нового соединения SQLite (см. core.sqlite).
+# Проверить на своем диске: python manage.py benchmark_sqlite_writes
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # В режиме WAL NORMAL не теряет целостность, только последние
+    # транзакции при отключении питания.
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 128 * 1024 * 1024,
+    # Отрицательное значение — размер кеша страниц в КиБ.
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
 }
 
 # Password validation
@@ -125,8 +171,49 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Лимиты на картинки постов: проверяются во время потоковой загрузки
+POSTS_UPLOAD_MAX_BYTES = 5 * 1024 * 1024
+POSTS_UPLOAD_MAX_PIXELS = 40_000_000
+# Полнотекстовый индекс постов; для других СУБД — свой бэкенд
+# или posts.search.SearchBackend (поиск через LIKE).
+POSTS_SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Сколько SQL-запросов может сделать view с прогретым кешем
+# (см. core.metrics). Не зависит от числа постов на странице:
+# N+1 сразу выходит за бюджет. В ленты с кнопками подписки заложен
+# запрос подписок читателя (posts.following) на случай пустого кеша.
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:hot': 4,
+    'posts:group_list': 5,
+    'posts:profile': 5,
+    'posts:profile_followers': 4,
+    'posts:profile_following': 4,
+    'posts:post_detail': 6,
+    'posts:post_comments': 3,
+    'posts:search': 6,
+    'posts:follow_index': 5,
+    'posts:api_index': 2,
+    'posts:api_group': 2,
+    'posts:api_profile': 3,
+    'posts:api_post': 4,
+    'posts:api_follow': 7,
+}
+
+# Фоновые задачи (см. core.tasks). Без воркера task_worker задачи
+# выполняются сразу в запросе: так по умолчанию в разработке и тестах.
+TASK_BROKER = 'core.tasks.DatabaseBroker'
+TASKS_ALWAYS_EAGER = os.environ.get(
+    'YATUBE_TASKS_EAGER', str(DEBUG)
+) == 'True'
+TASK_MAX_RETRIES = 3
+# Задержка перед повтором в секундах; удваивается с каждой попыткой.
+TASK_RETRY_BACKOFF = 5
+# Через сколько секунд задача упавшего воркера снова попадет в очередь.
+TASK_VISIBILITY_TIMEOUT = 60 * 10
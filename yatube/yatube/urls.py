@@ -3,6 +3,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core import views as core_views
+
 handler404 = 'core.views.page_not_found'
 
 urlpatterns = [
@@ -11,6 +13,8 @@ urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
+    path('metrics/', core_views.metrics, name='metrics'),
+    path('metrics/tasks/', core_views.task_metrics, name='task_metrics'),
 ]
 
 if settings.DEBUG: